@@ -0,0 +1,535 @@
+import argparse
+import os
+import contextlib
+import io
+import json
+import platform
+import random
+import subprocess
+import re
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import List
+
+from word_counter import Article, analyze_articles, word_occurs_first_in, extract_text_from_p_section, unescape, \
+    extract_p_sections, extract_transcription_section, extract_sections, load_article, load_lazy_article, \
+    first_occurrence_per_word, write_article, process_file_data, group_words_in_list, plot_word_counts, \
+    write_first_occurrences, extract_text_from_all_p_sections, analyze
+from spill_analysis import analyze_with_spill_files
+from word_exercise import load_exercise_files
+
+test_files = Path(__file__).parent / 'test' / 'test_files'
+
+
+syllables = ['ba', 'ré', 'lo', 'ça', 'mi', 'tè', 'pu', 'on', 'cha', 'gê', 'ri', 'vou', 'ssé', 'na', 'è', 'que']
+
+
+def synthetic_vocabulary(vocabulary_size: int) -> List[str]:
+    vocabulary = []
+    for i in range(vocabulary_size):
+        word = ''
+        while True:
+            word += syllables[i % len(syllables)]
+            i //= len(syllables)
+            if i == 0:
+                break
+        vocabulary.append(word)
+    return vocabulary
+
+
+def zipf_weights(vocabulary_size: int) -> List[float]:
+    # word frequencies follow a rough Zipf distribution, like a real transcript
+    return [1 / (rank + 1) for rank in range(vocabulary_size)]
+
+
+def synthetic_word_counts(episodes: int, vocabulary_size: int, words_per_episode: int, seed=42) -> List[Article]:
+    rng = random.Random(seed)
+    vocabulary = synthetic_vocabulary(vocabulary_size)
+    weights = zipf_weights(vocabulary_size)
+    articles = []
+    for episode in range(1, episodes + 1):
+        word_count = dict()
+        for word in rng.choices(vocabulary, weights, k=words_per_episode):
+            word_count[word] = word_count.get(word, 0) + 1
+        articles.append(Article(f'{episode}.json', '', episode, word_count))
+    rng.shuffle(articles)
+    return articles
+
+
+site_chrome = """<!doctype html>
+<html lang="fr-FR">
+<head>
+<meta charset="UTF-8">
+<title>#{episode:02d} Épisode &#8211; innerFrench</title>
+<link rel='stylesheet' href='https://innerfrench.com/wp-content/style.css' media='all' />
+<script>var sonaar = {{"episode": {episode}}};</script>
+</head>
+<body>
+<section class="elementor-section elementor-top-section"><nav><a href="/">Accueil</a> <a href="/podcast/">Podcast</a></nav></section>
+<section class="elementor-section"><h2 class="elementor-heading-title">Résumé</h2><p>Dans cet épisode&#8230;</p></section>
+<section class="elementor-section elementor-top-section" data-element_type="section">
+<h2 class="elementor-heading-title elementor-size-default">Transcription de l&#8217;épisode</h2>
+{paragraphs}
+</section>
+<footer><p>&copy; innerFrench</p></footer>
+</body>
+</html>
+"""
+
+timestamp_anchor = '<a id="sonaar_ts-{id:x}" class="srmp3_sonaar_ts_shortcode"  style="" ' \
+                   'href="javascript:sonaar_ts_shortcode({{ trackid:\'0\', time:\'{time}\' }}) ;">[{time}]</a> '
+tooltip = '<span class="tooltips " style="" title="{word}"><strong>{word}</strong></span>'
+
+
+def synthetic_paragraph(rng: random.Random, vocabulary, weights, words_per_paragraph, second):
+    words = rng.choices(vocabulary, weights, k=words_per_paragraph)
+    parts = []
+    for i, word in enumerate(words):
+        if rng.random() < 0.05:
+            word = tooltip.format(word=word)
+        elif i % 11 == 10:
+            word += rng.choice(['.', ',', ' ?', ' !', ' :', '&#8230;'])
+        parts.append(word)
+    time_stamp = f'00:{second // 60:02d}:{second % 60:02d}'
+    return '<p>' + timestamp_anchor.format(id=rng.getrandbits(48), time=time_stamp) + ' '.join(parts) + '</p>'
+
+
+def synthetic_pages(episodes: int, paragraphs: int, vocabulary_size: int, words_per_paragraph: int, seed=42):
+    rng = random.Random(seed)
+    vocabulary = synthetic_vocabulary(vocabulary_size)
+    weights = zipf_weights(vocabulary_size)
+    for episode in range(1, episodes + 1):
+        page_paragraphs = [synthetic_paragraph(rng, vocabulary, weights, words_per_paragraph, 10 * p)
+                           for p in range(paragraphs)]
+        yield episode, site_chrome.format(episode=episode, paragraphs='\n'.join(page_paragraphs))
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=Path(__file__).parent).stdout.strip()
+    except OSError:
+        return None
+
+
+def best_time(repeat, func, *args):
+    seconds = [time_it(func, *args)[0] for _ in range(repeat)]
+    return min(seconds)
+
+
+def time_it(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def analyze_articles_per_word(articles: List[Article]):
+    words = set()
+    [words.update(article.word_count.keys()) for article in articles]
+    return {word: word_occurs_first_in(word, articles) for word in words}
+
+
+def bench_first_occurrences(episode_counts, vocabulary_size, words_per_episode, compare_limit):
+    print(f'{"episodes":>10} {"single pass (s)":>16} {"per word (s)":>14}')
+    for episodes in episode_counts:
+        articles = synthetic_word_counts(episodes, vocabulary_size, words_per_episode)
+        single_pass, _ = time_it(analyze_articles, articles)
+        per_word = '-'
+        if episodes <= compare_limit:
+            per_word = f'{time_it(analyze_articles_per_word, articles)[0]:.3f}'
+        print(f'{episodes:>10} {single_pass:>16.3f} {per_word:>14}')
+
+
+# the replace() chain extract_text_from_p_section used before, kept to compare against
+def extract_text_with_replace_chain(data):
+    result = unescape(data)
+    result = result.replace('</li>', ' ').replace('</i>', ' ').replace('<i>', ' ').replace('<br/>', ' ').replace(
+        '<br />', ' ').replace('<br>', ' ').replace('<p>', ' ').replace('</p>', ' ').replace('</span>', ' ').replace(
+        '</strong>', ' ').replace('“', '').replace('</b>', ' ').replace('<b>', ' ').replace('<em>', ' ').replace(
+        '</em>', ' ').replace('<em>', ' ').replace('«', '').replace('»', '').replace('–', ' ').replace('…', ' ')
+
+    result = re.sub('<strong.*?>', ' ', result)
+    result = re.sub('<span.*?>', ' ', result)
+    result = re.sub('<a.*?>', ' ', result)
+    result = re.sub('\\[.*?]', '', result)
+    result = result.replace('\n', ' ').replace('.', ' ').replace(',', ' ').replace(':', ' ').replace('\'', '').replace(
+        '(', ' ').replace(')', ' ').replace('?', ' ').replace('!', ' ').replace('!', ' ').replace('$', ' ').replace(
+        '%', ' ').replace('</a>', ' ')
+
+    return re.sub(r"\s+", ' ', result).strip()
+
+
+# the tokenizer group_words_in_list used before, kept to compare against
+def remove_junk_words_with_re_match(word):
+    if re.match('^[0-9]+.*', word) or re.match('^[0-9]+$', word) or re.match('^\\*\\*\\*$', word):
+        return ''
+    elif word in [';', '-', ',', '/', '+', '=', '&']:
+        return ''
+    return word.strip()
+
+
+def group_words_with_split(data):
+    words = dict()
+    for line in data:
+        for word in [remove_junk_words_with_re_match(word) for word in line.lower().split(' ')]:
+            if len(word.strip()) > 0:
+                words[word] = words.get(word, 0) + 1
+    return words
+
+
+def bench_tokenize(episodes, paragraphs, words_per_paragraph, repeat):
+    lines = [extract_text_from_p_section(paragraph)
+             for _, page in synthetic_pages(episodes, paragraphs, 20000, words_per_paragraph)
+             for paragraph in extract_p_sections(extract_transcription_section(extract_sections(page)))]
+    if group_words_with_split(lines) != group_words_in_list(lines):
+        raise ValueError('the tokenizers give different word counts')
+
+    tokens = sum(group_words_in_list(lines).values())
+    for name, func in [('split and re.match', group_words_with_split), ('count then filter', group_words_in_list)]:
+        seconds = best_time(repeat, func, lines)
+        print(f'{name:>18}: {seconds:.3f}s, {tokens / seconds / 1e6:.2f}M tokens/s')
+
+
+def load_test_paragraphs():
+    paragraphs = []
+    for file_name in ['1.json', '2-test.json']:
+        with open(test_files / file_name, 'r', encoding='utf-8') as file:
+            page = json.load(file)['text']
+        paragraphs.extend(extract_p_sections(extract_transcription_section(extract_sections(page))))
+    return paragraphs
+
+
+def bench_normalise(repeat):
+    paragraphs = load_test_paragraphs()
+    for paragraph in paragraphs:
+        if extract_text_with_replace_chain(paragraph) != extract_text_from_p_section(paragraph):
+            raise ValueError(f'different output for {paragraph}')
+
+    size = sum(len(paragraph) for paragraph in paragraphs) * repeat
+    for name, func in [('replace chain', extract_text_with_replace_chain), ('compiled', extract_text_from_p_section)]:
+        seconds, _ = time_it(lambda: [func(paragraph) for _ in range(repeat) for paragraph in paragraphs])
+        print(f'{name:>14}: {seconds:.3f}s, {size / seconds / 1e6:.1f} MB/s')
+
+
+def write_copies_of_test_articles(articles_path: Path, episodes):
+    pages = [load_article(test_files / file_name) for file_name in ['1.json', '2-test.json']]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for episode in range(1, episodes + 1):
+            page = pages[episode % len(pages)]
+            write_article(Article(f'{episode}.json', page.text, episode, page.word_count), articles_path)
+
+
+def peak_memory(func, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(*args)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def first_occurrences_of_stored_articles(loader, paths):
+    return first_occurrence_per_word([loader(path) for path in paths])
+
+
+def bench_memory(episodes):
+    with tempfile.TemporaryDirectory() as data_path:
+        write_copies_of_test_articles(Path(data_path), episodes)
+        paths = sorted(Path(data_path).glob('*.json'))
+        for name, loader in [('Article', load_article), ('LazyArticle', load_lazy_article)]:
+            seconds, peak = peak_memory(first_occurrences_of_stored_articles, loader, paths)
+            print(f'{name:>12}: {seconds:.3f}s, peak {peak / 1e6:.1f} MB for {episodes} episodes')
+
+
+def folder_size(path: Path):
+    return sum(file.stat().st_size for file in path.rglob('*') if file.is_file())
+
+
+def bench_store(episodes):
+    # the files as write_article wrote them before, with the whole page, next to the files it writes now
+    pages = [load_article(test_files / file_name) for file_name in ['1.json', '2-test.json']]
+    with tempfile.TemporaryDirectory() as data_path:
+        old_path, new_path = Path(data_path) / 'old', Path(data_path) / 'new'
+        os.makedirs(old_path)
+        os.makedirs(new_path)
+        for episode in range(1, episodes + 1):
+            page = pages[episode % len(pages)]
+            article = Article(f'{episode}.json', page.text, episode, page.word_count)
+            with open(old_path / f'{episode}.json', 'w') as file:
+                file.write(json.dumps(article.__dict__))
+        write_seconds, _ = time_it(write_copies_of_test_articles, new_path, episodes)
+        for name, path in [('whole page', old_path), ('section', new_path)]:
+            paths = sorted(path.glob('*.json'))
+            seconds, articles = time_it(lambda: [load_article(article_path) for article_path in paths])
+            counts_seconds, _ = time_it(lambda: [process_file_data(article.text) for article in articles])
+            print(f'{name:>12}: {folder_size(path) / 1e6:.2f} MB, load {seconds:.3f}s, '
+                  f'count words {counts_seconds:.3f}s for {episodes} episodes')
+        print(f'{"":>12}  {folder_size(new_path / "chunks") / 1e6:.2f} MB of it in the chunk store, '
+              f'writing took {write_seconds:.3f}s')
+
+
+def bench_spill(episodes, vocabulary_size, words_per_episode, max_memory):
+    # the synthetic articles have no page text, so the memory is spent on the word counts
+    with tempfile.TemporaryDirectory() as data_path, contextlib.redirect_stdout(io.StringIO()):
+        os.makedirs(Path(data_path) / 'articles')
+        for article in synthetic_word_counts(episodes, vocabulary_size, words_per_episode):
+            write_article(article, Path(data_path) / 'articles')
+        results = [('in memory', peak_memory(analyze, Path(data_path))),
+                   ('spill files', peak_memory(analyze_with_spill_files, Path(data_path), max_memory * 1000000))]
+    for name, (seconds, peak) in results:
+        print(f'{name:>12}: {seconds:.3f}s, peak {peak / 1e6:.1f} MB for {episodes} episodes')
+
+
+def bench_decks(decks, words_per_deck):
+    rng = random.Random(42)
+    vocabulary = synthetic_vocabulary(words_per_deck * 2)
+    with tempfile.TemporaryDirectory() as data_path:
+        decks_path = Path(data_path) / 'words'
+        os.makedirs(decks_path)
+        for deck in range(decks):
+            rows = ''.join(f'| {rng.choice(vocabulary)} | {rng.choice(vocabulary)} // note |\n'
+                           for _ in range(words_per_deck))
+            (decks_path / f'deck{deck}.md').write_text(f'| question | réponse |\n|---|---|\n{rows}', encoding='utf-8')
+        cache_path = Path(data_path) / 'words_cache.bin'
+        results = [('no cache', time_it(load_exercise_files, [decks_path])),
+                   ('cold cache', time_it(load_exercise_files, [decks_path], cache_path)),
+                   ('warm cache', time_it(load_exercise_files, [decks_path], cache_path))]
+    for name, (seconds, words) in results:
+        print(f'{name:>12}: {seconds:.3f}s for {len(words)} words in {decks} decks')
+
+
+def count_words_with_lists(page):
+    # process_file_data before it was made of generators: every stage kept its whole output in a list
+    sections = extract_sections(page)
+    p_sections = extract_p_sections(extract_transcription_section(sections))
+    lines = extract_text_from_all_p_sections(p_sections)
+    return group_words_in_list(lines)
+
+
+def bench_streaming(paragraphs, words_per_paragraph):
+    _, page = next(synthetic_pages(1, paragraphs, 20000, words_per_paragraph))
+    if count_words_with_lists(page) != process_file_data(page):
+        raise ValueError('the pipelines give different word counts')
+
+    print(f'page of {len(page) / 1e6:.1f} MB with {paragraphs} paragraphs')
+    for name, func in [('lists', count_words_with_lists), ('generators', process_file_data)]:
+        seconds, peak = peak_memory(func, page)
+        print(f'{name:>12}: {seconds:.3f}s, peak {peak / 1e6:.1f} MB')
+
+
+startup_commands = [['sync'], ['analyze'], ['compact'], ['query', 'robots'], ['reload'], ['plot', '--file', 'plot.png'],
+                    ['exercise', '--file', 'data/words/exercise.md']]
+
+
+def import_times(stderr):
+    # the cumulative microseconds of the modules imported at the top level, lines look like
+    # 'import time:      4832 |      65960 | main', nested imports have more spaces before their name
+    times = dict()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or line.endswith('| imported package'):
+            continue
+        _, cumulative, name = line.split('|')
+        if name.startswith(' ') and not name.startswith('  '):
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def time_command(command, cwd, repeat):
+    # the command runs in a copy of the code, so sync doesn't download anything and the data folder is the copy's
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        process = subprocess.run([sys.executable, '-X', 'importtime', 'main.py'] + command, cwd=cwd,
+                                 capture_output=True, text=True, input='\n' * 100)
+        seconds = time.perf_counter() - start
+        if best is None or seconds < best[0]:
+            best = seconds, import_times(process.stderr), process.returncode
+    return best
+
+
+def bench_startup(repeat):
+    with tempfile.TemporaryDirectory() as code_path:
+        code_path = Path(code_path)
+        for source_file in Path(__file__).parent.glob('*.py'):
+            shutil.copy(source_file, code_path / source_file.name)
+        os.makedirs(code_path / 'data' / 'articles')
+        write_copies_of_test_articles(code_path / 'data' / 'articles', 10)
+        (code_path / 'data' / 'urls.txt').write_text('')
+        os.makedirs(code_path / 'data' / 'words')
+        shutil.copy(Path(__file__).parent / 'data' / 'words' / 'exercice5.md', code_path / 'data' / 'words' /
+                    'exercise.md')
+        shutil.copy(Path(__file__).parent / 'data' / 'lemmas.tsv', code_path / 'data' / 'lemmas.tsv')
+
+        print(f'{"command":>10} {"seconds":>8} {"imports":>8}  slowest imports')
+        for command in startup_commands:
+            seconds, times, returncode = time_command(command, code_path, repeat)
+            slowest = sorted(times.items(), key=lambda item: -item[1])[:3]
+            failed = '' if returncode == 0 else f'  (exit code {returncode})'
+            print(f'{command[0]:>10} {seconds:>8.3f} {sum(times.values()) / 1e6:>8.3f}  ' +
+                  ', '.join(f'{name} {cumulative / 1e6:.3f}' for name, cumulative in slowest) + failed)
+
+
+def bench_pipeline(episodes, paragraphs, vocabulary_size, words_per_paragraph, repeat, output_file):
+    pages = list(synthetic_pages(episodes, paragraphs, vocabulary_size, words_per_paragraph))
+    page_bytes = sum(len(page.encode('utf-8')) for _, page in pages)
+    lines = [extract_text_from_p_section(paragraph) for _, page in pages
+             for paragraph in extract_p_sections(extract_transcription_section(extract_sections(page)))]
+    articles = [Article(f'{episode}.json', '', episode, process_file_data(page)) for episode, page in pages]
+    first_occurrences = analyze_articles(articles)
+
+    stages = dict()
+
+    def record(name, seconds, items):
+        stages[name] = {'seconds': seconds, 'items': items, 'items_per_second': items / seconds if seconds else None}
+        print(f'{name:>20}: {seconds:.4f}s for {items} items')
+
+    record('process_file_data', best_time(repeat, lambda: [process_file_data(page) for _, page in pages]),
+           len(pages))
+    record('group_words_in_list', best_time(repeat, group_words_in_list, lines), len(lines))
+    record('analyze_articles', best_time(repeat, analyze_articles, articles), len(articles))
+    with tempfile.TemporaryDirectory() as data_path, contextlib.redirect_stdout(io.StringIO()):
+        write_first_occurrences(Path(data_path), first_occurrences)
+        plot_seconds = best_time(repeat, plot_word_counts, Path(data_path), Path(data_path) / 'plot.png', 10, False)
+        cached_plot_seconds = best_time(repeat, plot_word_counts, Path(data_path), Path(data_path) / 'plot.png')
+    record('plot_word_counts', plot_seconds, len(first_occurrences))
+    record('plot_word_counts (cached)', cached_plot_seconds, len(first_occurrences))
+
+    results = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'parameters': {'episodes': episodes, 'paragraphs': paragraphs, 'vocabulary': vocabulary_size,
+                       'words_per_paragraph': words_per_paragraph, 'repeat': repeat, 'page_bytes': page_bytes},
+        'stages': stages,
+    }
+    with open(output_file, 'w', encoding='utf-8') as file:
+        file.write(json.dumps(results, indent=2))
+    print(f'output in {output_file}')
+    return results
+
+
+def compare_results(baseline_file, results_file):
+    with open(baseline_file, 'r', encoding='utf-8') as file:
+        baseline = json.load(file)
+    with open(results_file, 'r', encoding='utf-8') as file:
+        results = json.load(file)
+    if baseline['parameters'] != results['parameters']:
+        print('WARNING: the results were measured with different parameters')
+    print(f'{"stage":>20} {baseline["commit"] or "baseline":>10} {results["commit"] or "results":>10} {"ratio":>7}')
+    for name, stage in results['stages'].items():
+        if name in baseline['stages']:
+            before = baseline['stages'][name]['seconds']
+            print(f'{name:>20} {before:>10.4f} {stage["seconds"]:>10.4f} {stage["seconds"] / before:>7.2f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(help='help for subcommand', dest="subcommand", required=True)
+
+    first_occurrences_parser = subparsers.add_parser('first-occurrences',
+                                                     help='time analyze_articles on synthetic corpora')
+    first_occurrences_parser.add_argument('--episodes', dest='episodes', type=int, nargs='+',
+                                          default=[100, 1000, 10000, 20000],
+                                          help='The corpus sizes to time')
+    first_occurrences_parser.add_argument('--vocabulary', dest='vocabulary', type=int, default=50000,
+                                          help='The number of distinct words in the corpus')
+    first_occurrences_parser.add_argument('--words', dest='words', type=int, default=2000,
+                                          help='The number of words per episode')
+    first_occurrences_parser.add_argument('--compare-limit', dest='compare_limit', type=int, default=200,
+                                          help='Also time the per-word scan up to this many episodes')
+
+    normalise_parser = subparsers.add_parser('normalise', help='time extract_text_from_p_section on the test pages')
+    normalise_parser.add_argument('--repeat', dest='repeat', type=int, default=200,
+                                  help='The number of times every paragraph is normalised')
+
+    memory_parser = subparsers.add_parser('memory', help='compare the memory analyze needs to load the articles')
+    memory_parser.add_argument('--episodes', dest='episodes', type=int, default=200,
+                               help='The number of copies of the test articles to load')
+
+    tokenize_parser = subparsers.add_parser('tokenize', help='time group_words_in_list on long synthetic transcripts')
+    tokenize_parser.add_argument('--episodes', dest='episodes', type=int, default=10,
+                                 help='The number of pages to generate')
+    tokenize_parser.add_argument('--paragraphs', dest='paragraphs', type=int, default=200,
+                                 help='The number of paragraphs per page')
+    tokenize_parser.add_argument('--words', dest='words', type=int, default=100,
+                                 help='The number of words per paragraph')
+    tokenize_parser.add_argument('--repeat', dest='repeat', type=int, default=3,
+                                 help='The tokenizers are timed this many times, the best time is reported')
+
+    pipeline_parser = subparsers.add_parser('pipeline', help='time every stage of the pipeline on synthetic pages')
+    pipeline_parser.add_argument('--episodes', dest='episodes', type=int, default=50,
+                                 help='The number of pages to generate')
+    pipeline_parser.add_argument('--paragraphs', dest='paragraphs', type=int, default=60,
+                                 help='The number of paragraphs per page')
+    pipeline_parser.add_argument('--vocabulary', dest='vocabulary', type=int, default=20000,
+                                 help='The number of distinct words in the corpus')
+    pipeline_parser.add_argument('--words', dest='words', type=int, default=80,
+                                 help='The number of words per paragraph')
+    pipeline_parser.add_argument('--repeat', dest='repeat', type=int, default=3,
+                                 help='Every stage is timed this many times, the best time is reported')
+    pipeline_parser.add_argument('--output', dest='output_file', type=str, default='bench_output.json',
+                                 help='The file to write the results to')
+
+    streaming_parser = subparsers.add_parser('streaming',
+                                             help='compare the peak memory of process_file_data on one huge page')
+    streaming_parser.add_argument('--paragraphs', dest='paragraphs', type=int, default=20000,
+                                  help='The number of paragraphs of the page')
+    streaming_parser.add_argument('--words', dest='words', type=int, default=100,
+                                  help='The number of words per paragraph')
+
+    startup_parser = subparsers.add_parser('startup', help='time the imports of every main.py command')
+    startup_parser.add_argument('--repeat', dest='repeat', type=int, default=3,
+                                help='Every command runs this many times, the fastest run is reported')
+
+    spill_parser = subparsers.add_parser('spill', help='compare the memory of analyze with and without spill files')
+    spill_parser.add_argument('--episodes', dest='episodes', type=int, default=300,
+                              help='The number of articles to generate')
+    spill_parser.add_argument('--vocabulary', dest='vocabulary', type=int, default=100000,
+                              help='The number of distinct words in the corpus')
+    spill_parser.add_argument('--words', dest='words', type=int, default=3000,
+                              help='The number of words per article')
+    spill_parser.add_argument('--max-memory', dest='max_memory', type=int, default=20,
+                              help='The MB of word counts analyze --max-memory keeps in memory')
+
+    decks_parser = subparsers.add_parser('decks', help='time loading many exercise files with and without the cache')
+    decks_parser.add_argument('--decks', dest='decks', type=int, default=1000, help='The number of files to generate')
+    decks_parser.add_argument('--words', dest='words', type=int, default=50, help='The number of rows per file')
+
+    store_parser = subparsers.add_parser('store', help='compare the size and load time of stored articles')
+    store_parser.add_argument('--episodes', dest='episodes', type=int, default=100,
+                              help='The number of copies of the test pages to store')
+
+    compare_parser = subparsers.add_parser('compare', help='compare two result files written by pipeline')
+    compare_parser.add_argument('baseline_file', type=str, help='The results to compare against')
+    compare_parser.add_argument('results_file', type=str, help='The new results')
+
+    command = parser.parse_args()
+
+    if command.subcommand == 'first-occurrences':
+        bench_first_occurrences(command.episodes, command.vocabulary, command.words, command.compare_limit)
+    elif command.subcommand == 'normalise':
+        bench_normalise(command.repeat)
+    elif command.subcommand == 'memory':
+        bench_memory(command.episodes)
+    elif command.subcommand == 'tokenize':
+        bench_tokenize(command.episodes, command.paragraphs, command.words, command.repeat)
+    elif command.subcommand == 'pipeline':
+        bench_pipeline(command.episodes, command.paragraphs, command.vocabulary, command.words, command.repeat,
+                       command.output_file)
+    elif command.subcommand == 'streaming':
+        bench_streaming(command.paragraphs, command.words)
+    elif command.subcommand == 'startup':
+        bench_startup(command.repeat)
+    elif command.subcommand == 'spill':
+        bench_spill(command.episodes, command.vocabulary, command.words, command.max_memory)
+    elif command.subcommand == 'decks':
+        bench_decks(command.decks, command.words)
+    elif command.subcommand == 'store':
+        bench_store(command.episodes)
+    elif command.subcommand == 'compare':
+        compare_results(command.baseline_file, command.results_file)
@@ -0,0 +1,187 @@
+import json
+import mmap
+import os
+from collections import Counter
+from array import array
+from os import listdir
+from os.path import isfile, join
+from pathlib import Path
+from typing import Iterable
+
+from word_counter import Article, load_article, group_by_first_occurrence, WordCount, write_first_occurrences, \
+    WordFrequencies, write_word_frequencies, list_article_files, word_index_path, sweep_chunks
+from word_index import write_word_index
+from timings import timed
+
+# A corpus folder holds
+# - vocabulary.txt: one word per line, the line number is the id of the word
+# - counts.bin: per episode an array('I') of word ids followed by an array('I') of their counts
+# - pages.blob: the utf-8 text of every page, only read when a page is asked for
+# - episodes.json: per episode the file name, sequence number and where its data is in counts.bin and pages.blob
+# - files.json: the size and mtime of the article files it was made from, to tell when it is out of date
+# The arrays are stored in the byte order of the machine that wrote them.
+
+
+@timed('corpus io')
+def write_corpus(articles: Iterable[Article], corpus_path: Path):
+    os.makedirs(corpus_path, exist_ok=True)
+    vocabulary = dict()
+    episodes = []
+    with open(corpus_path / 'counts.bin', 'wb') as counts_file, open(corpus_path / 'pages.blob', 'wb') as pages_file:
+        for article in articles:
+            ids = array('I', [vocabulary.setdefault(word, len(vocabulary)) for word in article.word_count.keys()])
+            counts = array('I', article.word_count.values())
+            page = article.text.encode('utf-8')
+            episodes.append({'file_name': article.file_name, 'sequence_number': article.sequence_number,
+                             'counts_offset': counts_file.tell(), 'words': len(ids),
+                             'page_offset': pages_file.tell(), 'page_length': len(page)})
+            counts_file.write(ids.tobytes())
+            counts_file.write(counts.tobytes())
+            pages_file.write(page)
+
+    with open(corpus_path / 'vocabulary.txt', 'w', encoding='utf-8') as file:
+        file.writelines(word + '\n' for word in vocabulary.keys())
+    episodes.sort(key=lambda episode: episode['sequence_number'])
+    with open(corpus_path / 'episodes.json', 'w', encoding='utf-8') as file:
+        file.write(json.dumps(episodes))
+
+
+def iter_stored_articles(articles_path: Path):
+    for f in sorted(listdir(articles_path)):
+        if isfile(join(articles_path, f)) and f.endswith('.json'):
+            yield load_article(articles_path / f)
+
+
+def compact(data_path: Path):
+    corpus_path = data_path / 'corpus'
+    files = list_article_files(data_path / 'articles')
+    write_corpus(iter_stored_articles(data_path / 'articles'), corpus_path)
+    with open(corpus_path / 'files.json', 'w', encoding='utf-8') as file:
+        file.write(json.dumps(files))
+    print(f'output in {str(corpus_path)}')
+    sweep_chunks(data_path / 'articles')
+
+
+def is_up_to_date(data_path: Path):
+    files_file = data_path / 'corpus' / 'files.json'
+    if not os.path.exists(files_file):
+        return False
+    with open(files_file, 'r', encoding='utf-8') as file:
+        return json.load(file) == list_article_files(data_path / 'articles')
+
+
+class CorpusStore:
+    def __init__(self, corpus_path: Path):
+        self.corpus_path = corpus_path
+        with open(corpus_path / 'vocabulary.txt', 'r', encoding='utf-8') as file:
+            self.vocabulary = file.read().splitlines()
+        with open(corpus_path / 'episodes.json', 'r', encoding='utf-8') as file:
+            self.episodes = {episode['sequence_number']: episode for episode in json.load(file)}
+        self.counts = b''
+        if os.path.getsize(corpus_path / 'counts.bin') > 0:
+            with open(corpus_path / 'counts.bin', 'rb') as file:
+                self.counts = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        if isinstance(self.counts, mmap.mmap):
+            self.counts.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def sequence_numbers(self):
+        return list(self.episodes.keys())
+
+    def word_ids(self, sequence_number):
+        episode = self.episodes[sequence_number]
+        start = episode['counts_offset']
+        return memoryview(self.counts)[start:start + 4 * episode['words']].cast('I')
+
+    def word_id_counts(self, sequence_number):
+        episode = self.episodes[sequence_number]
+        start = episode['counts_offset'] + 4 * episode['words']
+        return memoryview(self.counts)[start:start + 4 * episode['words']].cast('I')
+
+    def word_count(self, sequence_number) -> dict[str, int]:
+        return {self.vocabulary[word_id]: count for word_id, count in
+                zip(self.word_ids(sequence_number), self.word_id_counts(sequence_number))}
+
+    def page_text(self, sequence_number) -> str:
+        episode = self.episodes[sequence_number]
+        with open(self.corpus_path / 'pages.blob', 'rb') as file:
+            file.seek(episode['page_offset'])
+            return file.read(episode['page_length']).decode('utf-8')
+
+    def article(self, sequence_number) -> Article:
+        episode = self.episodes[sequence_number]
+        return Article(episode['file_name'], self.page_text(sequence_number), sequence_number,
+                       self.word_count(sequence_number))
+
+    @timed('first occurrences')
+    def first_occurrence_per_word(self) -> dict[str, int]:
+        first_occurrence = dict()
+        seen = bytearray(len(self.vocabulary))
+        for sequence_number in sorted(self.episodes.keys()):
+            for word_id in self.word_ids(sequence_number):
+                if not seen[word_id]:
+                    seen[word_id] = 1
+                    first_occurrence[self.vocabulary[word_id]] = sequence_number
+        return first_occurrence
+
+    def postings(self) -> dict[str, dict[int, int]]:
+        postings = dict()
+        for sequence_number in sorted(self.episodes.keys()):
+            for word_id, count in zip(self.word_ids(sequence_number), self.word_id_counts(sequence_number)):
+                postings.setdefault(self.vocabulary[word_id], dict())[sequence_number] = count
+        return postings
+
+    @timed('frequencies')
+    def word_frequencies(self) -> WordFrequencies:
+        import numpy as np
+
+        frequencies = WordFrequencies()
+        episodes = [self.episodes[sequence_number] for sequence_number in sorted(self.episodes.keys())]
+
+        # gather the ids and counts of all episodes with one index array instead of a slice per episode
+        data = np.frombuffer(self.counts, dtype=np.uint32)
+        lengths = np.array([episode['words'] for episode in episodes], dtype=np.int64)
+        offsets = np.array([episode['counts_offset'] // 4 for episode in episodes], dtype=np.int64)
+        starts = np.cumsum(lengths) - lengths
+        id_positions = np.repeat(offsets - starts, lengths) + np.arange(lengths.sum())
+        ids = data[id_positions]
+        counts = data[id_positions + np.repeat(lengths, lengths)].astype(np.int64)
+
+        words_per_episode = np.zeros(len(episodes), dtype=np.int64)
+        if len(counts) > 0:
+            words_per_episode[lengths > 0] = np.add.reduceat(counts, starts[lengths > 0])
+        for episode, words in zip(episodes, words_per_episode.tolist()):
+            frequencies.add_episode(episode['sequence_number'], words, episode['words'])
+
+        total = np.bincount(ids, weights=counts, minlength=len(self.vocabulary)).astype(np.int64)
+        documents = np.bincount(ids, minlength=len(self.vocabulary))
+        frequencies.total = Counter(dict(zip(self.vocabulary, total.tolist())))
+        frequencies.documents = Counter(dict(zip(self.vocabulary, documents.tolist())))
+        return frequencies
+
+
+def analyze_corpus(data_path: Path) -> list[WordCount]:
+    # articles that were synced or reloaded since the last compact would be missing or out of date
+    if not is_up_to_date(data_path):
+        print('the articles changed since the last compact, compacting again')
+        compact(data_path)
+    with CorpusStore(data_path / 'corpus') as corpus:
+        first_occurrences = group_by_first_occurrence(corpus.first_occurrence_per_word())
+        frequencies = corpus.word_frequencies()
+        frequencies.postings = corpus.postings()
+    write_first_occurrences(data_path, first_occurrences)
+    write_word_frequencies(data_path, frequencies)
+    write_word_index(word_index_path(data_path), frequencies.postings)
+
+    # the state of analyze --incremental doesn't match these files anymore
+    state_file = data_path / 'first_occurrences_state.json'
+    if os.path.exists(state_file):
+        os.remove(state_file)
+    return first_occurrences
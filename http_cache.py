@@ -0,0 +1,63 @@
+import hashlib
+import json
+import os
+import zlib
+from pathlib import Path
+
+# Every cached page has two files in the cache folder, named after the sha1 of its url:
+# - <sha1>.json with the url, ETag and Last-Modified headers of the response
+# - <sha1>.html.z with the zlib compressed body
+
+
+class HttpCache:
+    def __init__(self, cache_path: Path):
+        self.cache_path = cache_path
+
+    def file_name(self, url, extension):
+        return self.cache_path / (hashlib.sha1(url.encode('utf-8')).hexdigest() + extension)
+
+    def headers(self, url):
+        # a page is only cached when both files are there
+        if not os.path.exists(self.file_name(url, '.json')) or not os.path.exists(self.file_name(url, '.html.z')):
+            return None
+        with open(self.file_name(url, '.json'), 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    def body(self, url):
+        with open(self.file_name(url, '.html.z'), 'rb') as file:
+            return zlib.decompress(file.read()).decode('utf-8')
+
+    def store(self, url, response):
+        os.makedirs(self.cache_path, exist_ok=True)
+        with open(self.file_name(url, '.html.z'), 'wb') as file:
+            file.write(zlib.compress(response.text.encode('utf-8'), 9))
+        with open(self.file_name(url, '.json'), 'w', encoding='utf-8') as file:
+            file.write(json.dumps({'url': url, 'etag': response.headers.get('ETag'),
+                                   'last_modified': response.headers.get('Last-Modified')}))
+
+    def conditional_headers(self, url):
+        cached = self.headers(url)
+        if cached is None:
+            return {}
+        headers = dict()
+        if cached['etag'] is not None:
+            headers['If-None-Match'] = cached['etag']
+        if cached['last_modified'] is not None:
+            headers['If-Modified-Since'] = cached['last_modified']
+        return headers
+
+
+def get_with_cache(url, cache: HttpCache, cookies, headers):
+    # returns the page and whether it changed since it was cached
+    import requests
+
+    response = requests.get(url, cookies=cookies, headers={**headers, **cache.conditional_headers(url)})
+    if response.status_code == 304:
+        try:
+            return cache.body(url), False
+        except FileNotFoundError:
+            # removed since the request was sent, the page is downloaded again
+            response = requests.get(url, cookies=cookies, headers=headers)
+    if response.ok:
+        cache.store(url, response)
+    return response.text, True
@@ -0,0 +1,49 @@
+import hashlib
+import unicodedata
+from collections import Counter
+from pathlib import Path
+
+default_lemma_table = Path(__file__).parent / 'data' / 'lemmas.tsv'
+
+# l’aliment, d’aliments and qu’appliquent count as the word after the apostrophe
+elisions = {'c', 'd', 'j', 'l', 'm', 'n', 's', 't', 'qu', 'jusqu', 'lorsqu', 'puisqu'}
+
+
+def load_lemma_table(path: Path) -> dict[str, str]:
+    # lines are 'form<TAB>lemma', lines starting with '#' are comments
+    table = dict()
+    with open(path, 'r', encoding='utf-8') as file:
+        for line in file:
+            if not line.strip() or line.startswith('#'):
+                continue
+            form, lemma = line.rstrip('\n').split('\t')
+            table[unicodedata.normalize('NFC', form)] = unicodedata.normalize('NFC', lemma)
+    return table
+
+
+class Lemmatizer:
+    # Maps a word to its lemma with one dict lookup: the word is NFC normalised, an elided article or pronoun is
+    # dropped and the rest is looked up in the table. Words that are not in the table are their own lemma.
+    def __init__(self, table: dict[str, str], name=None):
+        self.table = table
+        self.name = name
+
+    def __call__(self, word):
+        word = unicodedata.normalize('NFC', word)
+        apostrophe = word.find('’')
+        if 0 < apostrophe < len(word) - 1 and word[:apostrophe] in elisions:
+            word = word[apostrophe + 1:]
+        return self.table.get(word, word)
+
+    def word_count(self, word_count: dict[str, int]) -> Counter:
+        lemmas = Counter()
+        for word, count in word_count.items():
+            lemmas[self(word)] += count
+        return lemmas
+
+
+def load_lemmatizer(path: Path = default_lemma_table) -> Lemmatizer:
+    # the name changes with the table, so analyze --incremental notices when the table was edited
+    with open(path, 'rb') as file:
+        name = f'{path.name}:{hashlib.sha1(file.read()).hexdigest()}'
+    return Lemmatizer(load_lemma_table(path), name)
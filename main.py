@@ -2,39 +2,274 @@ from pathlib import Path
 import argparse
 from word_counter import read_data_from_file, extract_sections, extract_transcription_section, extract_p_sections, \
     extract_text_from_all_p_sections, group_words_in_list, sync_podcasts, analyze, re_load, plot_word_counts, \
-    analyze_articles
-from word_exercise import do_exercise
+    analyze_articles, load_changed_text_from_url, normalise_word
+from word_exercise import do_exercise, exercise_words
+from corpus_store import compact, analyze_corpus
+from lemmas import load_lemmatizer
+from word_index import query
+import timings
 
 parser = argparse.ArgumentParser()
+parser.add_argument('--timings',
+                    dest='timings',
+                    action='store_true',
+                    help='Print how much time the stages of the command took',
+                    )
+parser.add_argument('--timings-file',
+                    dest='timings_file',
+                    type=str,
+                    help='Also write the timings as json to this file',
+                    )
+parser.add_argument('--profile',
+                    dest='profile_file',
+                    type=str,
+                    help='Run the command with cProfile and write the statistics to this file',
+                    )
 subparsers = parser.add_subparsers(help='help for subcommand', dest="subcommand", required=True)
 
 sync_data_parser = subparsers.add_parser('sync', help='sync data from Inner French website and store on filesystem')
+# one way of downloading at a time, the pages of --stream are not kept in the http cache
+sync_mode_group = sync_data_parser.add_mutually_exclusive_group()
+sync_mode_group.add_argument('--refresh',
+                              dest='refresh',
+                              action='store_true',
+                              help='Download pages again when they changed since the last sync, also existing ones',
+                              )
+sync_mode_group.add_argument('--stream',
+                              dest='stream',
+                              action='store_true',
+                              help='Parse pages while they are downloaded and only store the transcription',
+                              )
+sync_mode_group.add_argument('--jobs',
+                              dest='jobs',
+                              type=int,
+                              default=1,
+                              help='The number of pages to download at the same time',
+                              )
+sync_data_parser.add_argument('--rate',
+                              dest='requests_per_second',
+                              type=float,
+                              default=2.0,
+                              help='The maximum number of requests per second to a single host when --jobs > 1',
+                              )
+sync_data_parser.add_argument('--retries',
+                              dest='retries',
+                              type=int,
+                              default=3,
+                              help='The number of times a failed download is retried when --jobs > 1',
+                              )
 analyze_data_parser = subparsers.add_parser('analyze', help='analyze data from Inner French website')
+analyze_data_parser.add_argument('--incremental',
+                              dest='incremental',
+                              action='store_true',
+                              help='Only analyze articles that were added since the last run',
+                              )
+analyze_data_parser.add_argument('--corpus',
+                              dest='corpus',
+                              action='store_true',
+                              help='Analyze the word counts in data/corpus, see the compact command',
+                              )
+analyze_data_parser.add_argument('--lemma',
+                              dest='lemma',
+                              action='store_true',
+                              help='Count lemmas instead of words, e.g. aliments as aliment, using data/lemmas.tsv',
+                              )
+analyze_data_parser.add_argument('--max-memory',
+                              dest='max_memory',
+                              type=int,
+                              help='Analyze in steps that keep at most this many MB of word counts in memory',
+                              )
+compact_parser = subparsers.add_parser('compact', help='store the word counts of all articles in data/corpus')
 re_analyze_parser = subparsers.add_parser('reload', help='reanalyze data using files downloaded from Inner French website')
+re_analyze_parser.add_argument('--jobs',
+                              dest='jobs',
+                              type=int,
+                              default=1,
+                              help='The number of processes that parse articles at the same time',
+                              )
 exercise_parser = subparsers.add_parser('exercise', help='train words from taaltempo')
 exercise_parser.add_argument('--file',
                               dest='file_name',
                               type=str,
                               help='The name of the file to load from data/words',
                               )
+exercise_parser.add_argument('--episode',
+                              dest='episode',
+                              type=int,
+                              help='Train the words that occur first in this episode, in their first sentence',
+                              )
+exercise_parser.add_argument('--lemma',
+                              dest='lemma',
+                              action='store_true',
+                              help='Train the lemmas of an episode, for the words written by analyze --lemma',
+                              )
+exercise_parser.add_argument('--review',
+                              dest='review',
+                              action='store_true',
+                              help='Only ask the cards that are due, the reviews are kept in data/reviews.sqlite',
+                              )
+exercise_parser.add_argument('--new',
+                              dest='new_cards',
+                              type=int,
+                              default=20,
+                              help='The number of cards that were never reviewed to add to a --review session',
+                              )
+import_parser = subparsers.add_parser('import', help='add html, text, epub and srt files to the articles')
+import_parser.add_argument('paths',
+                              nargs='+',
+                              help='The files to add, the supported files in a folder are added too',
+                              )
+import_parser.add_argument('--first-number',
+                              dest='first_number',
+                              type=int,
+                              default=1000,
+                              help='The sequence number of the first new document, the next ones count up from it',
+                              )
+import_parser.add_argument('--refresh',
+                              dest='refresh',
+                              action='store_true',
+                              help='Read documents again that were already added',
+                              )
+query_parser = subparsers.add_parser('query', help='list the episodes a word occurs in, using the index analyze writes')
+query_parser.add_argument('words',
+                              nargs='+',
+                              help='The word to look up, with more words the episodes that contain all of them',
+                              )
+query_parser.add_argument('--prefix',
+                              dest='prefix',
+                              action='store_true',
+                              help='List the words that start with each of the given words',
+                              )
+query_parser.add_argument('--lemma',
+                              dest='lemma',
+                              action='store_true',
+                              help='Look up the lemmas of the words, for an index written by analyze --lemma',
+                              )
 plot_parser = subparsers.add_parser('plot', help='plot the word counts and output to a file')
 plot_parser.add_argument('--file',
                               dest='output_file_name',
                               type=str,
                               help='The name of the output file',
                               )
+plot_parser.add_argument('--window',
+                              dest='window',
+                              type=int,
+                              default=10,
+                              help='The number of episodes the rolling average is taken over',
+                              )
+serve_parser = subparsers.add_parser('serve', help='keep the analysis in memory and answer queries over http')
+serve_parser.add_argument('--host',
+                              dest='host',
+                              type=str,
+                              default='127.0.0.1',
+                              help='The address to listen on',
+                              )
+serve_parser.add_argument('--port',
+                              dest='port',
+                              type=int,
+                              default=8000,
+                              help='The port to listen on',
+                              )
+serve_parser.add_argument('--socket',
+                              dest='socket_path',
+                              type=str,
+                              help='Listen on this unix socket instead of a port',
+                              )
+serve_parser.add_argument('--interval',
+                              dest='interval',
+                              type=float,
+                              default=2.0,
+                              help='The number of seconds between checks for new articles',
+                              )
+serve_parser.add_argument('--lemma',
+                              dest='lemma',
+                              action='store_true',
+                              help='Count the lemmas of the words, as analyze --lemma does',
+                              )
+
+def run(command):
+    # the modules that download pages load requests, the other commands don't need it
+    if command.subcommand == 'sync':
+        from podcast_sync import sync_podcasts_concurrently
+        from transcript_parser import load_transcript_from_url
+        if command.refresh:
+            sync_podcasts('urls.txt', Path('data'), load_changed_text_from_url, refresh=True)
+        elif command.stream:
+            sync_podcasts('urls.txt', Path('data'), load_transcript_from_url)
+        elif command.jobs > 1:
+            sync_podcasts_concurrently('urls.txt', Path('data'), command.jobs, command.requests_per_second,
+                                       command.retries)
+        else:
+            sync_podcasts('urls.txt', Path('data'))
+    elif command.subcommand == 'analyze':
+        if command.corpus and command.lemma:
+            print('--lemma only works on the articles, not with --corpus')
+        elif command.corpus:
+            analyze_corpus(Path('data'))
+        elif command.max_memory:
+            from spill_analysis import analyze_with_spill_files
+            analyze_with_spill_files(Path('data'), command.max_memory * 1000000,
+                                     load_lemmatizer() if command.lemma else None)
+        else:
+            analyze(Path('data'), command.incremental, load_lemmatizer() if command.lemma else None)
+    elif command.subcommand == 'compact':
+        compact(Path('data'))
+    elif command.subcommand == 'reload':
+        re_load(Path('data'), command.jobs)
+    elif command.subcommand == 'import':
+        from sources import LocalFilesSource, sync_source
+        source = LocalFilesSource([Path(path) for path in command.paths], command.first_number,
+                                  Path('data') / 'import_numbers.json')
+        sync_source(source, Path('data'), command.refresh)
+    elif command.subcommand == 'query':
+        words = [normalise_word(word) for word in command.words]
+        if command.lemma:
+            lemmatize = load_lemmatizer()
+            words = [lemmatize(word) for word in words]
+        query(Path('data'), words, command.prefix)
+    elif command.subcommand == 'plot':
+        plot_word_counts(Path('data'), command.output_file_name, command.window)
+    elif command.subcommand == 'serve':
+        from service import serve
+        serve(Path('data'), command.host, command.port, command.socket_path, command.interval,
+              load_lemmatizer() if command.lemma else None)
+    elif command.subcommand == 'exercise' and command.episode is not None:
+        from sentence_index import episode_deck
+        deck = episode_deck(Path('data'), command.episode, load_lemmatizer() if command.lemma else None)
+        if command.review:
+            from review_schedule import review_words
+            review_words(f'episode {command.episode}', deck, Path('data') / 'reviews.sqlite', command.new_cards)
+        else:
+            exercise_words(deck)
+    elif command.subcommand == 'exercise':
+        if command.review:
+            from review_schedule import do_review
+            do_review(command.file_name, Path('data') / 'reviews.sqlite', command.new_cards,
+                      cache_path=Path('data') / 'words_cache.bin')
+        else:
+            do_exercise(command.file_name, Path('data') / 'words_cache.bin')
+    else:
+        print(f'unknown command {command.subcommand}')
+
+
+# reload --jobs starts worker processes, they must not run the command again
+if __name__ == '__main__':
+    command = parser.parse_args()
+    if command.timings or command.timings_file:
+        timings.enable()
+
+    if command.profile_file:
+        import cProfile
+        import pstats
+
+        profile = cProfile.Profile()
+        profile.runcall(run, command)
+        profile.dump_stats(command.profile_file)
+        pstats.Stats(profile).sort_stats('cumulative').print_stats(20)
+    else:
+        run(command)
 
-command = parser.parse_args()
-
-if command.subcommand == 'sync':
-    sync_podcasts('urls.txt', Path('data'))
-elif command.subcommand == 'analyze':
-    analyze(Path('data'))
-elif command.subcommand == 'reload':
-    re_load(Path('data'))
-elif command.subcommand == 'plot':
-    plot_word_counts(Path('data'), command.output_file_name)
-elif command.subcommand == 'exercise':
-    do_exercise(command.file_name)
-else:
-    print(f'unknown command {command.subcommand}')
+    if command.timings:
+        timings.print_summary()
+    if command.timings_file:
+        timings.write_summary(Path(command.timings_file))
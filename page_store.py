@@ -0,0 +1,79 @@
+import base64
+import hashlib
+import os
+import zlib
+from pathlib import Path
+
+# A chunk store is a folder with the parts of the pages that are the same on every page of a site: the header,
+# the menus, the scripts and the footer. Every chunk is a file named after the sha1 of its text, so a chunk that
+# occurs on many pages is stored once. A chunk ends after a line whose crc32 ends in 6 zero bits, so the chunks of
+# two pages line up again a few lines after a line that differs.
+
+boundary_mask = (1 << 6) - 1
+max_chunk_lines = 256
+
+
+def split_chunks(text) -> list[str]:
+    chunks = []
+    lines = []
+    for line in text.splitlines(keepends=True):
+        lines.append(line)
+        if zlib.crc32(line.encode('utf-8')) & boundary_mask == 0 or len(lines) == max_chunk_lines:
+            chunks.append(''.join(lines))
+            lines = []
+    if lines:
+        chunks.append(''.join(lines))
+    return chunks
+
+
+def compress_text(text) -> str:
+    # a json string, base64 of the zlib compressed utf-8 text
+    return base64.b64encode(zlib.compress(text.encode('utf-8'), 9)).decode('ascii')
+
+
+def decompress_text(data) -> str:
+    return zlib.decompress(base64.b64decode(data)).decode('utf-8')
+
+
+class ChunkStore:
+    def __init__(self, path: Path):
+        self.path = path
+
+    def chunk_path(self, key) -> Path:
+        return self.path / key[:2] / key
+
+    def put(self, chunk) -> str:
+        key = hashlib.sha1(chunk.encode('utf-8')).hexdigest()
+        path = self.chunk_path(key)
+        if not os.path.exists(path):
+            os.makedirs(path.parent, exist_ok=True)
+            # written under another name first, a chunk file is either complete or not there
+            temporary_path = path.with_name(f'{key}.{os.getpid()}.tmp')
+            with open(temporary_path, 'wb') as file:
+                file.write(zlib.compress(chunk.encode('utf-8'), 9))
+            os.replace(temporary_path, path)
+        return key
+
+    def put_text(self, text) -> list[str]:
+        return [self.put(chunk) for chunk in split_chunks(text)]
+
+    def get(self, key) -> str:
+        with open(self.chunk_path(key), 'rb') as file:
+            return zlib.decompress(file.read()).decode('utf-8')
+
+    def get_text(self, keys: list[str]) -> str:
+        return ''.join(self.get(key) for key in keys)
+
+    def sweep(self, used_keys: set[str]) -> int:
+        # removes the chunks that are not in used_keys, e.g. the header of a page that was stored again after the
+        # site changed, returns the number of chunks removed
+        removed = 0
+        if not os.path.exists(self.path):
+            return removed
+        for folder in os.listdir(self.path):
+            for key in os.listdir(self.path / folder):
+                # a .tmp file is a chunk that is being written
+                if '.' not in key and key not in used_keys:
+                    os.remove(self.path / folder / key)
+                    removed += 1
+        return removed
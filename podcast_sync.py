@@ -0,0 +1,101 @@
+import os.path
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_cache import HttpCache
+from word_counter import Article, load_file_list, load_userdata, login_cookies, request_headers, write_article, \
+    construct_article_data_file_name, get_sequence_number_from_url_or_file, http_cache_path
+from timings import timed
+
+retry_status_codes = {429, 500, 502, 503, 504}
+
+
+class HostRateLimiter:
+    def __init__(self, requests_per_second: float, clock=time.monotonic, sleep=time.sleep):
+        self.interval = 1 / requests_per_second if requests_per_second > 0 else 0
+        self.next_request_time = dict()
+        self.lock = threading.Lock()
+        self.clock = clock
+        self.sleep = sleep
+
+    def wait(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            now = self.clock()
+            request_time = max(now, self.next_request_time.get(host, now))
+            self.next_request_time[host] = request_time + self.interval
+        if request_time > now:
+            self.sleep(request_time - now)
+
+
+@timed('download')
+def fetch_page(session: requests.Session, url, rate_limiter: HostRateLimiter, retries=3, backoff=0.5,
+               cache: HttpCache = None):
+    # the page is stored in the cache, so a later sync --refresh only downloads it again when it changed
+    attempt = 0
+    while True:
+        rate_limiter.wait(url)
+        try:
+            response = session.get(url, timeout=30)
+            if response.status_code not in retry_status_codes:
+                if cache is not None and response.ok:
+                    cache.store(url, response)
+                return response.text
+            error = f'status {response.status_code}'
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = str(e)
+        if attempt >= retries:
+            raise IOError(f'failed to load {url} after {retries + 1} attempts: {error}')
+        print(f'retrying {url} ({error})')
+        time.sleep(backoff * 2 ** attempt)
+        attempt += 1
+
+
+def create_session(userdata, pool_size):
+    session = requests.Session()
+    session.cookies.update(login_cookies(userdata))
+    session.headers.update(request_headers)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def sync_podcasts_concurrently(urls_data_file, data_root: Path, jobs=4, requests_per_second=2.0, retries=3,
+                               backoff=0.5, userdata=None) -> int:
+    data_path = Path(__file__).parent / data_root
+    article_path = data_path / 'articles'
+    urls = [url.strip() for url in load_file_list(urls_data_file, data_path)]
+    new_urls = []
+    for url in urls:
+        article_file_name = construct_article_data_file_name(get_sequence_number_from_url_or_file(url), article_path)
+        if os.path.exists(article_file_name):
+            print(f'skipping {article_file_name}')
+        else:
+            new_urls.append(url)
+
+    session = create_session(load_userdata() if userdata is None else userdata, jobs)
+    rate_limiter = HostRateLimiter(requests_per_second)
+    cache = HttpCache(http_cache_path(article_path))
+    executor = ThreadPoolExecutor(max_workers=jobs)
+    written = 0
+    try:
+        pages = {executor.submit(fetch_page, session, url, rate_limiter, retries, backoff, cache): url
+                 for url in new_urls}
+        for page in as_completed(pages):
+            url = pages[page]
+            print(f'loaded {url}')
+            # parsing stops the sync when the page has no transcription, i.e. the credentials are invalid
+            write_article(Article(url, page.result()), article_path)
+            written += 1
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        session.close()
+
+    return written
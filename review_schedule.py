@@ -0,0 +1,134 @@
+import heapq
+import sqlite3
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+
+from word_exercise import Word, load_exercise_files
+
+# Spaced repetition for the exercise files with the SM-2 algorithm: a card that is answered correctly comes back
+# after 1 day, then after 6 days and then after the previous interval times the ease of the card. A wrong answer
+# starts over at 1 day. reviews.sqlite keeps the state of every card that was reviewed and a log of all reviews. A card
+# is a question and its answer, a file can ask the same question twice with different answers.
+
+day = 24 * 60 * 60
+# how often a wrong card is asked again in the same session
+repeats_per_session = 1
+
+
+@dataclass
+class CardState:
+    repetitions: int = 0
+    interval: float = 0
+    ease: float = 2.5
+    due: float = 0
+
+
+def sm2(state: CardState, grade, now) -> CardState:
+    # grade: 5 perfect, 4 correct, 3 correct with difficulty, below 3 wrong
+    ease = max(1.3, state.ease + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+    if grade < 3:
+        return CardState(0, 1, ease, now + day)
+    if state.repetitions == 0:
+        interval = 1
+    elif state.repetitions == 1:
+        interval = 6
+    else:
+        interval = round(state.interval * state.ease)
+    return CardState(state.repetitions + 1, interval, ease, now + interval * day)
+
+
+class ReviewLog:
+    def __init__(self, db_path: Path):
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS cards (deck TEXT, question TEXT, answer TEXT, '
+                                'repetitions INTEGER, interval REAL, ease REAL, due REAL, '
+                                'PRIMARY KEY (deck, question, answer)) WITHOUT ROWID')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS reviews (deck TEXT, question TEXT, answer TEXT, '
+                                'reviewed_at REAL, grade INTEGER)')
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def states(self, deck) -> dict[Word, CardState]:
+        rows = self.connection.execute('SELECT question, answer, repetitions, interval, ease, due FROM cards '
+                                       'WHERE deck = ?', (deck,))
+        return {Word(question, answer): CardState(*state) for question, answer, *state in rows}
+
+    def record(self, deck, word: Word, state: CardState, grade, now):
+        # committed per answer, so stopping in the middle of a session keeps the answers so far
+        with self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO cards VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                    (deck, word.question, word.answer, state.repetitions, state.interval, state.ease,
+                                     state.due))
+            self.connection.execute('INSERT INTO reviews VALUES (?, ?, ?, ?, ?)',
+                                    (deck, word.question, word.answer, now, grade))
+
+
+def due_cards(words: list[Word], states: dict[Word, CardState], now, new_cards):
+    # a heap of (due, position in the file, word), cards that were never reviewed are due in file order but only
+    # new_cards of them per session
+    heap = []
+    for position, word in enumerate(words):
+        state = states.get(word)
+        if state is None:
+            if new_cards > 0:
+                heap.append((0, position, word))
+                new_cards -= 1
+        elif state.due <= now:
+            heap.append((state.due, position, word))
+    heapq.heapify(heap)
+    return heap
+
+
+def do_review(file_name, db_path: Path, new_cards=20, clock=time.time, ask=input, cache_path: Path = None):
+    return review_words(Path(file_name).name, load_exercise_files([Path(file_name)], cache_path), db_path, new_cards,
+                        clock, ask)
+
+
+def review_words(deck, words: list[Word], db_path: Path, new_cards=20, clock=time.time, ask=input):
+    correct = 0
+    incorrect = 0
+    with ReviewLog(db_path) as log:
+        states = log.states(deck)
+        heap = due_cards(words, states, clock(), new_cards)
+        print(f'{len(heap)} of {len(words)} cards are due')
+        answered = set()
+        repeats = Counter()
+        while heap:
+            _, position, word = heapq.heappop(heap)
+            try:
+                answer = ask(word.question + ': ').strip()
+            except EOFError:
+                break
+            if not answer:
+                # an empty answer skips the card, it stays due
+                print(f"Skipped: {word.answer}")
+                continue
+            now = clock()
+            if word.answer == answer:
+                print("check")
+                correct += 1
+                grade = 4
+            else:
+                print(f"Incorrect answer: {word.answer}")
+                incorrect += 1
+                grade = 1
+                # asked again in this session after the cards that are due already
+                if repeats[word] < repeats_per_session:
+                    repeats[word] += 1
+                    heapq.heappush(heap, (now, position, word))
+            # as in SM-2 only the first answer in a session schedules the card
+            if word not in answered:
+                answered.add(word)
+                states[word] = sm2(states.get(word, CardState()), grade, now)
+            log.record(deck, word, states[word], grade, now)
+    print(f"Correct: {correct}, Incorrect: {incorrect}")
+    return correct, incorrect
@@ -0,0 +1,169 @@
+import json
+import mmap
+import os
+import re
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+from timings import timed
+from word_counter import brackets, unescape, tokenize, iter_sections, extract_transcription_section, \
+    iter_p_sections, normalise_text, list_article_files, load_lazy_article, load_analyze_state
+from word_exercise import Word
+
+# A sentence index folder holds
+# - sentences.txt: an example sentence for every word, the first sentence of the transcripts it occurs in
+# - words.txt: the words in sorted order, one per line, the line number is the id of the word
+# - forms.txt: per word id the word as it is written in its sentence, another word than the lemma with --lemma
+# - offsets.bin: array('I') with per word id the start and end of its sentence in the bytes of sentences.txt
+# - state.json: the article files and the lemmas the index was made from, it is made again when they change
+# The articles are read in the order of the episodes, so the sentence of a word is in the episode where it occurs
+# first and the deck of an episode only has to look up its new words.
+
+markup = re.compile(r'<[^>]*>')
+sentence_end = re.compile(r'(?<=[.!?…])\s+')
+
+
+def sentence_index_path(data_path: Path) -> Path:
+    return data_path / 'sentences'
+
+
+def iter_sentences(page):
+    # the sentences of the transcription as they are written, without the markup and the [00:00:10] time stamps.
+    # Apostrophes are written the way the words are counted. The text is unescaped here, so it is tokenised with
+    # normalise_text and not with extract_text_from_p_section, which would unescape it again.
+    for paragraph in iter_p_sections(extract_transcription_section(iter_sections(page))):
+        text = ' '.join(brackets.sub('', markup.sub(' ', unescape(paragraph))).split()).replace("'", '’')
+        for sentence in sentence_end.split(text):
+            if sentence:
+                yield sentence
+
+
+def lemmatizer_name(lemmatizer):
+    return lemmatizer.name if lemmatizer is not None else None
+
+
+@timed('sentences')
+def write_sentence_index(data_path: Path, lemmatizer=None):
+    # with a lemmatizer the words are looked up by their lemma, as analyze --lemma counts them
+    articles_path = data_path / 'articles'
+    files = list_article_files(articles_path)
+    articles = sorted(load_lazy_article(articles_path / file_name) for file_name in files.keys())
+    index_path = sentence_index_path(data_path)
+    os.makedirs(index_path, exist_ok=True)
+
+    offsets = dict()
+    forms = dict()
+    with open(index_path / 'sentences.txt', 'wb') as sentences_file:
+        for article in articles:
+            for sentence in iter_sentences(article.text):
+                for form in set(tokenize(normalise_text(sentence))):
+                    word = lemmatizer(form) if lemmatizer is not None else form
+                    if word not in forms:
+                        forms[word] = form
+                if len(forms) > len(offsets):
+                    start = sentences_file.tell()
+                    sentences_file.write(sentence.encode('utf-8') + b'\n')
+                    for word in forms.keys() - offsets.keys():
+                        offsets[word] = (start, sentences_file.tell() - 1)
+
+    words = sorted(offsets.keys())
+    with open(index_path / 'words.txt', 'w', encoding='utf-8') as file:
+        file.writelines(word + '\n' for word in words)
+    with open(index_path / 'forms.txt', 'w', encoding='utf-8') as file:
+        file.writelines(forms[word] + '\n' for word in words)
+    with open(index_path / 'offsets.bin', 'wb') as file:
+        file.write(array('I', [offset for word in words for offset in offsets[word]]).tobytes())
+    with open(index_path / 'state.json', 'w', encoding='utf-8') as file:
+        file.write(json.dumps({'files': files, 'lemmatizer': lemmatizer_name(lemmatizer)}))
+    print(f'output in {str(index_path)}')
+
+
+def sentence_index_is_current(data_path: Path, lemmatizer=None):
+    state_file = sentence_index_path(data_path) / 'state.json'
+    if not os.path.exists(state_file):
+        return False
+    with open(state_file, 'r', encoding='utf-8') as file:
+        state = json.load(file)
+    return state['files'] == list_article_files(data_path / 'articles') and \
+        state.get('lemmatizer') == lemmatizer_name(lemmatizer)
+
+
+class SentenceIndex:
+    def __init__(self, index_path: Path):
+        with open(index_path / 'words.txt', 'r', encoding='utf-8') as file:
+            self.words = file.read().splitlines()
+        with open(index_path / 'forms.txt', 'r', encoding='utf-8') as file:
+            self.forms = file.read().splitlines()
+        with open(index_path / 'offsets.bin', 'rb') as file:
+            self.offsets = array('I', file.read())
+        self.sentences = b''
+        if os.path.getsize(index_path / 'sentences.txt') > 0:
+            with open(index_path / 'sentences.txt', 'rb') as file:
+                self.sentences = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        if isinstance(self.sentences, mmap.mmap):
+            self.sentences.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def example(self, word):
+        # the sentence of the word and the word as it is written in it
+        position = bisect_left(self.words, word)
+        if position == len(self.words) or self.words[position] != word:
+            return None
+        sentence = self.sentences[self.offsets[2 * position]:self.offsets[2 * position + 1]].decode('utf-8')
+        return sentence, self.forms[position]
+
+    def sentence(self, word):
+        example = self.example(word)
+        return example[0] if example is not None else None
+
+
+def cloze(sentence, word):
+    # the sentence with the word left out, None when the word can't be found in it as a whole word
+    match = re.search(r'(?<!\w)' + re.escape(word) + r'(?!\w)', sentence, re.IGNORECASE)
+    if match is None:
+        return None
+    return sentence[:match.start()] + '___' + sentence[match.end():]
+
+
+def load_episode_words(data_path: Path, episode) -> list[str]:
+    with open(data_path / 'first_occurrences.json', 'r', encoding='utf-8') as file:
+        return next((item['words'] for item in json.load(file) if item['episode'] == episode), [])
+
+
+def open_sentence_index(data_path: Path, lemmatizer=None) -> SentenceIndex:
+    if not sentence_index_is_current(data_path, lemmatizer):
+        write_sentence_index(data_path, lemmatizer)
+    return SentenceIndex(sentence_index_path(data_path))
+
+
+def deck_of_words(index: SentenceIndex, words: list[str]) -> list[Word]:
+    # a card for every word: its example sentence with the word left out, the answer is the word as it is written
+    # there, e.g. dort for the lemma dormir
+    deck = []
+    for word in words:
+        example = index.example(word)
+        question = cloze(*example) if example is not None else None
+        if question is not None:
+            deck.append(Word(question, example[1]))
+    return deck
+
+
+def episode_deck(data_path: Path, episode, lemmatizer=None) -> list[Word]:
+    # the words of first_occurrences.json are lemmas after analyze --lemma, the index has to use the same lemmas
+    state = load_analyze_state(data_path / 'first_occurrences_state.json')
+    if state is not None and state.get('lemmatizer') != lemmatizer_name(lemmatizer):
+        print('analyze counted the words in another way, use --lemma only when analyze used it')
+        return []
+    words = load_episode_words(data_path, episode)
+    with open_sentence_index(data_path, lemmatizer) as index:
+        deck = deck_of_words(index, words)
+    print(f'episode {episode} has {len(words)} new words, {len(deck)} with an example sentence')
+    return deck
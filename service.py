@@ -0,0 +1,229 @@
+import asyncio
+import json
+import os
+import stat
+import threading
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+from word_counter import WordFrequencies, list_article_files, load_analyze_state, analyze_incrementally, \
+    load_analyzed_article, add_analyzed_article, group_by_first_occurrence, normalise_word
+from sentence_index import open_sentence_index, deck_of_words
+
+# serve keeps the analysis of all articles in memory and answers over http:
+# - /stats: the number of episodes and words
+# - /words/<word>: the episodes a word occurs in, its first occurrence and how often it occurs
+# - /episodes/<n>: the number of words, distinct words and new words of an episode
+# - /episodes/<n>/deck: the exercise deck of the new words of an episode, as exercise --episode asks it
+# data/articles is checked for new articles every few seconds, they are added without reading the others again.
+# Reading the articles and making the sentence index are done in worker threads, so they don't hold up requests.
+
+reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}
+
+
+class Corpus:
+    def __init__(self, data_path: Path, lemmatizer=None):
+        self.data_path = data_path
+        self.articles_path = data_path / 'articles'
+        self.lemmatizer = lemmatizer
+        self.files = dict()
+        self.first_occurrence = dict()
+        self.frequencies = WordFrequencies()
+        self.new_words = dict()
+        self.version = 0
+        self.sentences = None
+        self.sentences_version = None
+        self.sentences_lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        # the files of the last analyze are used when they match the articles, only newer articles are read
+        files = list_article_files(self.articles_path)
+        state = load_analyze_state(self.data_path / 'first_occurrences_state.json')
+        result = analyze_incrementally(self.articles_path, files, state, self.lemmatizer) if state else None
+        if result is None:
+            self.update()
+            return
+        self.first_occurrence, self.frequencies = result
+        self.files = files
+        self.changed()
+
+    def update(self) -> int:
+        # returns the number of articles that were added, an article that changed or was removed means the
+        # analysis starts over
+        return self.apply(self.read_changes())
+
+    def read_changes(self):
+        # only reads, so it can run in a worker thread while requests are answered. After a reset the analysis is
+        # made here from scratch, otherwise only the new articles are read.
+        files = list_article_files(self.articles_path)
+        reset = None
+        for file_name, file_info in self.files.items():
+            if files.get(file_name) != file_info:
+                print(f'{file_name} changed or was removed, reading all articles')
+                reset = dict(), WordFrequencies()
+                break
+        known_files = self.files if reset is None else dict()
+        new_files = []
+        articles = []
+        for file_name in files.keys():
+            if file_name in known_files:
+                continue
+            try:
+                articles.append(load_analyzed_article(self.articles_path / file_name, self.lemmatizer))
+            except (OSError, ValueError, KeyError) as e:
+                # e.g. a file that an older version of sync is still writing, the next check reads it again
+                print(f'skipping {file_name}: {e}')
+                continue
+            new_files.append(file_name)
+        if reset is not None:
+            for article in articles:
+                add_analyzed_article(*reset, article)
+            articles = []
+        return files, new_files, articles, reset
+
+    def apply(self, changes) -> int:
+        files, new_files, articles, reset = changes
+        if reset is not None:
+            self.files = dict()
+            self.first_occurrence, self.frequencies = reset
+        for article in articles:
+            add_analyzed_article(self.first_occurrence, self.frequencies, article)
+        for file_name in new_files:
+            self.files[file_name] = files[file_name]
+        if new_files or reset is not None:
+            self.changed()
+        return len(new_files)
+
+    def changed(self):
+        self.new_words = {word_count.episode: word_count.words
+                          for word_count in group_by_first_occurrence(self.first_occurrence)}
+        # the sentence index is made again the next time a deck is asked for
+        self.version += 1
+
+    def close(self):
+        with self.sentences_lock:
+            self.close_sentences()
+
+    def close_sentences(self):
+        if self.sentences is not None:
+            self.sentences.close()
+            self.sentences = None
+
+    def lookup_word(self, word):
+        word = normalise_word(word)
+        if self.lemmatizer is not None:
+            word = self.lemmatizer(word)
+        if word not in self.frequencies.postings:
+            return None
+        return {'word': word, 'first_occurrence': self.first_occurrence[word], 'total': self.frequencies.total[word],
+                'documents': self.frequencies.documents[word],
+                'episodes': {str(episode): count
+                             for episode, count in sorted(self.frequencies.postings[word].items())}}
+
+    def episode(self, episode):
+        if episode not in self.frequencies.episodes:
+            return None
+        counts = self.frequencies.episodes[episode]
+        return {'episode': episode, 'words': counts['words'], 'distinct_words': counts['distinct'],
+                'new_words': self.new_words.get(episode, [])}
+
+    def deck(self, episode):
+        # runs in a worker thread, making the sentence index reads all articles
+        if episode not in self.frequencies.episodes:
+            return None
+        words = self.new_words.get(episode, [])
+        with self.sentences_lock:
+            if self.sentences is None or self.sentences_version != self.version:
+                self.close_sentences()
+                self.sentences_version = self.version
+                self.sentences = open_sentence_index(self.data_path, self.lemmatizer)
+            return [{'question': word.question, 'answer': word.answer}
+                    for word in deck_of_words(self.sentences, words)]
+
+    def stats(self):
+        return {'episodes': len(self.frequencies.episodes), 'words': len(self.frequencies.postings)}
+
+
+async def route(corpus: Corpus, path) -> tuple[int, object]:
+    parts = [unquote(part) for part in urlsplit(path).path.strip('/').split('/')]
+    if parts == ['stats']:
+        return 200, corpus.stats()
+    if len(parts) == 2 and parts[0] == 'words':
+        result = corpus.lookup_word(parts[1])
+        return (200, result) if result is not None else (404, {'error': f'{parts[1]} does not occur in any episode'})
+    if len(parts) in (2, 3) and parts[0] == 'episodes' and parts[1].isdigit() and parts[2:] in ([], ['deck']):
+        episode = int(parts[1])
+        result = await asyncio.to_thread(corpus.deck, episode) if parts[2:] else corpus.episode(episode)
+        return (200, result) if result is not None else (404, {'error': f'there is no episode {episode}'})
+    return 404, {'error': f'unknown path {path}'}
+
+
+async def handle_request(corpus: Corpus, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    # one request per connection, the headers of the request are not used
+    try:
+        request_line = (await reader.readline()).decode('latin-1').split()
+        while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+            pass
+        if len(request_line) < 2:
+            status, body = 400, {'error': 'bad request'}
+        elif request_line[0] != 'GET':
+            status, body = 405, {'error': f'{request_line[0]} is not supported'}
+        else:
+            status, body = await route(corpus, request_line[1])
+        data = json.dumps(body).encode('utf-8')
+        writer.write(f'HTTP/1.1 {status} {reasons[status]}\r\nContent-Type: application/json; charset=utf-8\r\n'
+                     f'Content-Length: {len(data)}\r\nConnection: close\r\n\r\n'.encode('latin-1') + data)
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def watch_articles(corpus: Corpus, interval):
+    # the articles are read in a worker thread and added in the event loop, between requests
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            added = corpus.apply(await asyncio.to_thread(corpus.read_changes))
+        except Exception as e:
+            # the server keeps answering from what it has, the next check tries again
+            print(f'checking the articles failed: {e!r}')
+            continue
+        if added:
+            print(f'added {added} articles, {corpus.stats()["episodes"]} episodes')
+
+
+async def start_server(corpus: Corpus, host='127.0.0.1', port=8000, socket_path=None):
+    def handle(reader, writer):
+        return handle_request(corpus, reader, writer)
+
+    if socket_path is not None:
+        # a socket left by an earlier serve is removed, any other file is kept
+        if os.path.exists(socket_path):
+            if not stat.S_ISSOCK(os.stat(socket_path).st_mode):
+                raise FileExistsError(f'{socket_path} exists and is not a socket')
+            os.remove(socket_path)
+        return await asyncio.start_unix_server(handle, path=socket_path)
+    return await asyncio.start_server(handle, host, port)
+
+
+async def run_server(corpus: Corpus, host, port, socket_path, interval):
+    server = await start_server(corpus, host, port, socket_path)
+    print(f'serving on {socket_path if socket_path is not None else f"http://{host}:{port}"}')
+    watcher = asyncio.create_task(watch_articles(corpus, interval))
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        watcher.cancel()
+
+
+def serve(data_path: Path, host='127.0.0.1', port=8000, socket_path=None, interval=2.0, lemmatizer=None):
+    corpus = Corpus(data_path, lemmatizer)
+    print(f'loaded {corpus.stats()["episodes"]} episodes with {corpus.stats()["words"]} words')
+    try:
+        asyncio.run(run_server(corpus, host, port, socket_path, interval))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        corpus.close()
@@ -0,0 +1,229 @@
+import html
+import json
+import os
+import re
+import xml.etree.ElementTree as ElementTree
+import zipfile
+from dataclasses import dataclass
+from functools import partial
+from html.parser import HTMLParser
+from pathlib import Path, PurePosixPath
+from typing import Callable, Iterator, Optional
+
+from transcript_parser import transcription_marker
+from word_counter import Article, load_text_from_url, load_file_list, get_sequence_number_from_url_or_file, \
+    construct_article_data_file_name, write_article
+
+# A source lists documents, every document becomes an article in data/articles. The text of a document is only
+# loaded when its article doesn't exist yet, and it is turned into a page in the form process_file_data reads, so
+# analyze, reload and the other commands treat every article the same.
+
+
+@dataclass
+class Document:
+    name: str
+    sequence_number: int
+    # returns the page, or None when there is nothing new to store
+    load: Callable[[], Optional[str]]
+
+
+class InnerFrenchSource:
+    # the episodes in urls.txt, numbered by the episode number at the start of the last part of the url
+    def __init__(self, urls_data_file, data_path: Path, data_loader_func=load_text_from_url):
+        self.urls_data_file = urls_data_file
+        self.data_path = data_path
+        self.data_loader_func = data_loader_func
+
+    def documents(self) -> Iterator[Document]:
+        for url in load_file_list(self.urls_data_file, self.data_path):
+            url = url.strip()
+            if url:
+                yield Document(url, get_sequence_number_from_url_or_file(url),
+                               partial(self.data_loader_func, url, self.data_path / 'articles'))
+
+
+class ParagraphParser(HTMLParser):
+    # collects the text of an html page, every block element starts a new paragraph
+    block_tags = {'p', 'div', 'li', 'br', 'tr', 'td', 'dt', 'dd', 'blockquote', 'section', 'article',
+                  'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+    skipped_tags = {'head', 'script', 'style'}
+
+    def __init__(self):
+        super().__init__()
+        self.paragraphs = []
+        self.text = []
+        self.skipping = 0
+
+    def end_paragraph(self):
+        text = ' '.join(''.join(self.text).split())
+        if text:
+            self.paragraphs.append(text)
+        self.text = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.skipped_tags:
+            self.skipping += 1
+        elif tag in self.block_tags:
+            self.end_paragraph()
+
+    def handle_endtag(self, tag):
+        if tag in self.skipped_tags:
+            self.skipping = max(self.skipping - 1, 0)
+        elif tag in self.block_tags:
+            self.end_paragraph()
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.text.append(data)
+
+    def close(self):
+        super().close()
+        self.end_paragraph()
+
+
+def transcript_page(title, paragraphs) -> str:
+    page = [f'<section>\n<h2>{transcription_marker} {html.escape(title)}</h2>\n']
+    page.extend(f'<p>{html.escape(paragraph, quote=False)}</p>\n' for paragraph in paragraphs)
+    page.append('</section>\n')
+    return ''.join(page)
+
+
+def html_paragraphs(text):
+    parser = ParagraphParser()
+    parser.feed(text)
+    parser.close()
+    return parser.paragraphs
+
+
+def text_paragraphs(text):
+    # paragraphs are separated by an empty line
+    paragraphs = (' '.join(paragraph.split()) for paragraph in re.split(r'\n\s*\n', text))
+    return [paragraph for paragraph in paragraphs if paragraph]
+
+
+srt_markup = re.compile(r'<[^>]*>|\{[^}]*}')
+
+
+def srt_paragraphs(text):
+    # every subtitle is a number, a line with its start and end time and one or more lines of text
+    paragraphs = []
+    for block in re.split(r'\n\s*\n', text.replace('\r\n', '\n')):
+        lines = [line for line in block.strip().split('\n') if '-->' not in line and not line.strip().isdigit()]
+        paragraph = ' '.join(srt_markup.sub('', ' '.join(lines)).split())
+        if paragraph:
+            paragraphs.append(paragraph)
+    return paragraphs
+
+
+def read_text_file(path: Path):
+    with open(path, 'r', encoding='utf-8-sig', errors='replace') as file:
+        return file.read()
+
+
+def load_file_page(path: Path, paragraphs_func):
+    return transcript_page(path.name, paragraphs_func(read_text_file(path)))
+
+
+def epub_chapters(book: zipfile.ZipFile) -> list[str]:
+    # the chapters in reading order: container.xml names the package file, its spine lists the chapters
+    container = ElementTree.fromstring(book.read('META-INF/container.xml'))
+    package_path = container.find('.//{*}rootfile').get('full-path')
+    package = ElementTree.fromstring(book.read(package_path))
+    manifest = {item.get('id'): item.get('href') for item in package.findall('.//{*}item')}
+    package_folder = PurePosixPath(package_path).parent
+    return [str(package_folder / manifest[item.get('idref')]) for item in package.findall('.//{*}itemref')]
+
+
+def load_epub_chapter(path: Path, chapter):
+    with zipfile.ZipFile(path) as book:
+        text = book.read(chapter).decode('utf-8', errors='replace')
+    return transcript_page(f'{path.name} {chapter}', html_paragraphs(text))
+
+
+def read_single_document(paragraphs_func, path: Path):
+    yield str(path), partial(load_file_page, path, paragraphs_func)
+
+
+def read_epub(path: Path):
+    with zipfile.ZipFile(path) as book:
+        chapters = epub_chapters(book)
+    for chapter in chapters:
+        yield f'{path}#{chapter}', partial(load_epub_chapter, path, chapter)
+
+
+# per file extension a function that lists the documents in a file as (name, load) pairs
+readers = {
+    '.html': partial(read_single_document, html_paragraphs),
+    '.htm': partial(read_single_document, html_paragraphs),
+    '.xhtml': partial(read_single_document, html_paragraphs),
+    '.txt': partial(read_single_document, text_paragraphs),
+    '.srt': partial(read_single_document, srt_paragraphs),
+    '.epub': read_epub,
+}
+
+
+class LocalFilesSource:
+    # html, text, subtitle and epub files, the files in a folder are read too, an epub book has a document per
+    # chapter. New documents get the free numbers from first_sequence_number on in the order of their paths. The
+    # numbers are kept in numbers_file, so a document keeps its number when files are added later.
+    def __init__(self, paths: list[Path], first_sequence_number=1000, numbers_file: Path = None):
+        self.paths = paths
+        self.first_sequence_number = first_sequence_number
+        self.numbers_file = numbers_file
+
+    def files(self) -> Iterator[Path]:
+        for path in self.paths:
+            if path.is_dir():
+                yield from sorted(file for file in path.rglob('*') if file.suffix.lower() in readers)
+            elif path.suffix.lower() in readers:
+                yield path
+            else:
+                raise ValueError(f'{path} is not one of the supported files: {", ".join(readers.keys())}')
+
+    def load_numbers(self) -> dict[str, int]:
+        if self.numbers_file is None or not os.path.exists(self.numbers_file):
+            return dict()
+        with open(self.numbers_file, 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    def documents(self) -> Iterator[Document]:
+        documents = [(name, load) for path in self.files() for name, load in readers[path.suffix.lower()](path)]
+        numbers = self.load_numbers()
+        used = set(numbers.values())
+        sequence_number = self.first_sequence_number
+        for name, _ in documents:
+            if os.path.abspath(name) not in numbers:
+                while sequence_number in used:
+                    sequence_number += 1
+                numbers[os.path.abspath(name)] = sequence_number
+                used.add(sequence_number)
+        # stored before the articles are written, an article is never written under two numbers
+        if self.numbers_file is not None:
+            with open(self.numbers_file, 'w', encoding='utf-8') as file:
+                file.write(json.dumps(numbers, indent=1))
+        for name, load in documents:
+            yield Document(name, numbers[os.path.abspath(name)], load)
+
+
+def sync_source(source, data_root: Path, refresh=False) -> int:
+    # the articles are written one at a time, a large source doesn't have to fit in memory
+    data_path = Path(__file__).parent / data_root
+    articles_path = data_path / 'articles'
+    os.makedirs(articles_path, exist_ok=True)
+    written = 0
+    for document in source.documents():
+        article_file_name = construct_article_data_file_name(document.sequence_number, articles_path)
+        if os.path.exists(article_file_name) and not refresh:
+            print(f'skipping {article_file_name}')
+            continue
+        page = document.load()
+        if page is None:
+            continue
+        article = Article(document.name, page, document.sequence_number)
+        if not article.word_count:
+            print(f'skipping {document.name}, it has no words')
+            continue
+        write_article(article, articles_path)
+        written += 1
+
+    return written
@@ -0,0 +1,160 @@
+import heapq
+import json
+import marshal
+import os
+import sys
+import tempfile
+from itertools import groupby, islice
+from operator import itemgetter
+from pathlib import Path
+
+from timings import timed, count
+from word_counter import WordFrequencies, list_article_files, load_analyzed_article, word_index_path
+from word_index import write_sorted_word_index
+
+# analyze for corpora whose word counts don't fit in memory. Every article adds a (word, episode, count) tuple per
+# word to a SpillSorter, only one article is loaded at a time. Merging the sorted tuples gives the words in order,
+# each with its episodes in order: the first episode is the first occurrence, the sum of the counts the total. The
+# first occurrences and totals are sorted again the same way to write first_occurrences.json and
+# word_frequencies.json. The files are the same as the ones analyze writes.
+
+# the number of run files merged at the same time, more runs are merged in steps
+max_open_runs = 128
+# the size of every 100th tuple is measured to estimate the memory of all of them
+sample_interval = 100
+
+
+def tuple_size(item):
+    return sys.getsizeof(item) + sum(sys.getsizeof(value) for value in item) + 8
+
+
+class SpillSorter:
+    # Sorts tuples of strings and ints, more than fit in memory. The tuples are kept in a list until they take
+    # max_bytes, then the list is sorted and written to a run file. Iterating merges the runs with heapq.merge.
+    def __init__(self, folder: Path, name, max_bytes):
+        self.folder = folder
+        self.name = name
+        self.max_bytes = max_bytes
+        self.items = []
+        self.sampled_bytes = 0
+        self.samples = 0
+        self.runs = []
+        self.written_runs = 0
+
+    def add(self, item):
+        self.items.append(item)
+        if (len(self.items) - 1) % sample_interval == 0:
+            self.sampled_bytes += tuple_size(item)
+            self.samples += 1
+            if len(self.items) * self.sampled_bytes / self.samples >= self.max_bytes:
+                self.spill()
+
+    def chunk_length(self):
+        # while the runs are merged every run has a chunk in memory, together they take half of max_bytes
+        item_bytes = self.sampled_bytes / self.samples if self.samples else 100
+        return max(16, int(self.max_bytes / (2 * max_open_runs * item_bytes)))
+
+    @timed('spill')
+    def spill(self):
+        self.items.sort()
+        self.write_run(self.items)
+        self.items = []
+
+    def write_run(self, items):
+        # the run files only live as long as the sorter, marshal is the fastest way to store tuples for that long
+        path = self.folder / f'{self.name}-{self.written_runs}.run'
+        self.written_runs += 1
+        chunk_length = self.chunk_length()
+        items = iter(items)
+        with open(path, 'wb') as file:
+            while chunk := list(islice(items, chunk_length)):
+                marshal.dump(chunk, file)
+        self.runs.append(path)
+        count('spill files')
+
+    @staticmethod
+    def read_run(path: Path):
+        with open(path, 'rb') as file:
+            while True:
+                try:
+                    chunk = marshal.load(file)
+                except EOFError:
+                    return
+                yield from chunk
+
+    def __iter__(self):
+        if not self.runs:
+            # popping from the end gives the memory of the tuples back while they are read
+            self.items.sort(reverse=True)
+            while self.items:
+                yield self.items.pop()
+            return
+        if self.items:
+            self.spill()
+        while len(self.runs) > max_open_runs:
+            runs, self.runs = self.runs[:max_open_runs], self.runs[max_open_runs:]
+            self.write_run(heapq.merge(*(self.read_run(run) for run in runs)))
+            for run in runs:
+                os.remove(run)
+        yield from heapq.merge(*(self.read_run(run) for run in self.runs))
+
+
+def write_first_occurrences_from_sorted(data_path: Path, new_words):
+    # new_words are (episode, word) pairs in order, the file is the one write_first_occurrences writes
+    first_occurrences_file = data_path / 'first_occurrences.json'
+    episode_counts = []
+    with open(first_occurrences_file, 'w') as file:
+        file.write('[')
+        for episode, group in groupby(new_words, key=itemgetter(0)):
+            words = [word for _, word in group]
+            file.write((', ' if episode_counts else '') +
+                       json.dumps({'episode': episode, 'count': len(words), 'words': words}))
+            episode_counts.append({'episode': episode, 'count': len(words)})
+        file.write(']')
+    print(f'output in {str(first_occurrences_file)}')
+    with open(data_path / 'episode_counts.json', 'w') as file:
+        file.write(json.dumps(episode_counts))
+
+
+def write_word_frequencies_from_sorted(data_path: Path, episodes: WordFrequencies, totals):
+    # totals are (-total, word, documents) tuples in order, the file is the one write_word_frequencies writes
+    word_frequencies_file = data_path / 'word_frequencies.json'
+    with open(word_frequencies_file, 'w') as file:
+        file.write('{"episodes": ' + json.dumps(episodes.to_dict()['episodes']) + ', "words": [')
+        for i, (total, word, documents) in enumerate(totals):
+            file.write((', ' if i else '') + json.dumps({'word': word, 'total': -total, 'documents': documents}))
+        file.write(']}')
+    print(f'output in {str(word_frequencies_file)}')
+
+
+def analyze_with_spill_files(data_path: Path, max_bytes, lemmatizer=None):
+    articles_path = data_path / 'articles'
+    # only the number of words per episode is kept in memory
+    episodes = WordFrequencies()
+    with tempfile.TemporaryDirectory(dir=data_path) as spill_path:
+        occurrences = SpillSorter(Path(spill_path), 'occurrences', max_bytes)
+        for data_file in sorted(list_article_files(articles_path).keys()):
+            article = load_analyzed_article(articles_path / data_file, lemmatizer)
+            for word, word_count in article.word_count.items():
+                occurrences.add((word, article.sequence_number, word_count))
+            episodes.add_episode(article.sequence_number, sum(article.word_count.values()), len(article.word_count))
+
+        # the merge feeds both sorters at the same time, they share the memory
+        new_words = SpillSorter(Path(spill_path), 'new_words', max_bytes // 2)
+        totals = SpillSorter(Path(spill_path), 'totals', max_bytes // 2)
+
+        def word_postings():
+            for word, group in groupby(occurrences, key=itemgetter(0)):
+                postings = [(episode, word_count) for _, episode, word_count in group]
+                new_words.add((postings[0][0], word))
+                totals.add((-sum(word_count for _, word_count in postings), word, len(postings)))
+                yield word, postings
+
+        write_sorted_word_index(word_index_path(data_path), word_postings())
+        write_first_occurrences_from_sorted(data_path, new_words)
+        write_word_frequencies_from_sorted(data_path, episodes, totals)
+
+    # the state of analyze --incremental doesn't match these files anymore
+    state_file = data_path / 'first_occurrences_state.json'
+    if os.path.exists(state_file):
+        os.remove(state_file)
@@ -0,0 +1,38 @@
+import os
+import threading
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from sources import transcript_page
+from word_counter import Article, write_article
+
+
+@pytest.fixture
+def http_server():
+    # starts a local server with a request handler class and returns its url, the servers stop after the test
+    servers = []
+
+    def start(handler):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f'http://127.0.0.1:{server.server_port}'
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def write_test_articles(data_path: Path, articles):
+    os.makedirs(data_path / 'articles', exist_ok=True)
+    for article in articles:
+        write_article(article, data_path / 'articles')
+
+
+def write_test_article(data_path: Path, sequence_number, *paragraphs):
+    # an article with a transcription of the given paragraphs
+    write_test_articles(data_path, [Article(f'/x/{sequence_number}', transcript_page('episode', list(paragraphs)),
+                                            sequence_number)])
@@ -0,0 +1,68 @@
+import json
+import os
+import shutil
+from pathlib import Path
+from unittest import TestCase
+
+from corpus_store import write_corpus, CorpusStore, compact, analyze_corpus
+from word_counter import Article, analyze, WordCount, load_article, word_frequencies
+from word_index import WordIndex
+
+
+def test_corpus_store_keeps_word_counts_and_pages(tmpdir):
+    corpus_path = Path(tmpdir) / 'corpus'
+    write_corpus([Article('/x/2', '<p>deux</p>', 2, {'deux': 3, 'et': 1}),
+                  Article('/x/1', '<p>un</p>', 1, {'un': 1, 'et': 2})], corpus_path)
+
+    with CorpusStore(corpus_path) as corpus:
+        TestCase().assertEqual([1, 2], corpus.sequence_numbers())
+        TestCase().assertEqual({'un': 1, 'et': 2}, corpus.word_count(1))
+        TestCase().assertEqual({'deux': 3, 'et': 1}, corpus.word_count(2))
+        TestCase().assertEqual('<p>un</p>', corpus.page_text(1))
+        TestCase().assertEqual(Article('/x/2', '<p>deux</p>', 2, {'deux': 3, 'et': 1}), corpus.article(2))
+        TestCase().assertEqual({'un': 1, 'et': 1, 'deux': 2}, corpus.first_occurrence_per_word())
+
+
+def test_analyze_corpus_gives_the_same_result_as_analyze(tmpdir):
+    data_path = Path(tmpdir)
+    os.makedirs(data_path / 'articles')
+    shutil.copy(Path(__file__).parent / 'test_files' / '1.json', data_path / 'articles' / '1.json')
+    shutil.copy(Path(__file__).parent / 'test_files' / '2-test.json', data_path / 'articles' / '2.json')
+
+    expected = analyze(data_path)
+    with open(data_path / 'word_frequencies.json', 'r') as file:
+        expected_frequencies = json.load(file)
+    compact(data_path)
+    os.remove(data_path / 'first_occurrences.json')
+
+    TestCase().assertEqual(expected, analyze_corpus(data_path))
+    with open(data_path / 'first_occurrences.json', 'r') as file:
+        TestCase().assertEqual(expected, [WordCount.from_dict(item) for item in json.load(file)])
+    with open(data_path / 'word_frequencies.json', 'r') as file:
+        TestCase().assertEqual(expected_frequencies, json.load(file))
+    with CorpusStore(data_path / 'corpus') as corpus:
+        TestCase().assertEqual(load_article(data_path / 'articles' / '2.json'), corpus.article(2))
+    with WordIndex(data_path / 'index') as index:
+        TestCase().assertEqual({1: 1, 2: 1}, index.episodes('triste'))
+    TestCase().assertFalse(os.path.exists(data_path / 'first_occurrences_state.json'))
+
+
+def test_analyze_corpus_compacts_again_when_the_articles_changed(tmpdir):
+    data_path = Path(tmpdir)
+    os.makedirs(data_path / 'articles')
+    shutil.copy(Path(__file__).parent / 'test_files' / '1.json', data_path / 'articles' / '1.json')
+    compact(data_path)
+    shutil.copy(Path(__file__).parent / 'test_files' / '2-test.json', data_path / 'articles' / '2.json')
+
+    expected = analyze(data_path)
+    TestCase().assertEqual(expected, analyze_corpus(data_path))
+    with CorpusStore(data_path / 'corpus') as corpus:
+        TestCase().assertEqual([1, 2], corpus.sequence_numbers())
+
+
+def test_corpus_word_frequencies_match_the_articles(tmpdir):
+    articles = [Article('/x/2', '', 2, {'deux': 3, 'et': 1}), Article('/x/1', '', 1, {'un': 1, 'et': 2})]
+    write_corpus(articles, Path(tmpdir) / 'corpus')
+
+    with CorpusStore(Path(tmpdir) / 'corpus') as corpus:
+        TestCase().assertEqual(word_frequencies(articles).to_dict(), corpus.word_frequencies().to_dict())
@@ -0,0 +1,83 @@
+import os
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+from unittest import TestCase
+
+import pytest
+
+from http_cache import HttpCache, get_with_cache
+import word_counter
+from word_counter import get_new_article, load_changed_text_from_url, sync_podcasts, http_cache_path
+
+
+page = '<section><h2>Transcription de l’épisode</h2><p>page {version}</p></section>'
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    version = 'v1'
+    statuses = []
+
+    def do_GET(self):
+        etag = f'"{PageHandler.version}"'
+        if self.headers.get('If-None-Match') == etag:
+            PageHandler.statuses.append(304)
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        body = page.format(version=PageHandler.version).encode('utf-8')
+        PageHandler.statuses.append(200)
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def page_server(http_server):
+    PageHandler.version = 'v1'
+    PageHandler.statuses = []
+    return http_server(PageHandler) + '/01-episode/'
+
+
+def test_unchanged_pages_come_from_the_cache(tmpdir, page_server):
+    cache = HttpCache(Path(tmpdir) / 'http_cache')
+
+    TestCase().assertEqual((page.format(version='v1'), True), get_with_cache(page_server, cache, {}, {}))
+    TestCase().assertEqual((page.format(version='v1'), False), get_with_cache(page_server, cache, {}, {}))
+    PageHandler.version = 'v2'
+    TestCase().assertEqual((page.format(version='v2'), True), get_with_cache(page_server, cache, {}, {}))
+
+    TestCase().assertEqual([200, 304, 200], PageHandler.statuses)
+    TestCase().assertEqual('"v2"', cache.headers(page_server)['etag'])
+
+
+def test_refresh_skips_unchanged_pages(tmpdir):
+    def unchanged_page(url, data_path):
+        return None
+
+    TestCase().assertIsNone(get_new_article(unchanged_page, 'https://innerfrench.com/01-episode/', Path(tmpdir), True))
+
+
+def test_refresh_writes_removed_articles_again(tmpdir, page_server, mocker):
+    data_path = Path(tmpdir)
+    mocker.patch.object(word_counter, 'load_userdata', return_value='secret')
+    with open(data_path / 'urls.txt', 'w') as file:
+        file.write(page_server + '\n')
+    article_file = data_path / 'articles' / '1.json'
+
+    TestCase().assertEqual(1, sync_podcasts('urls.txt', data_path, load_changed_text_from_url, refresh=True))
+    TestCase().assertEqual(0, sync_podcasts('urls.txt', data_path, load_changed_text_from_url, refresh=True))
+    os.remove(article_file)
+    TestCase().assertEqual(1, sync_podcasts('urls.txt', data_path, load_changed_text_from_url, refresh=True))
+    TestCase().assertTrue(os.path.exists(article_file))
+
+    # a cache entry without its page is downloaded again
+    os.remove(HttpCache(http_cache_path(data_path / 'articles')).file_name(page_server, '.html.z'))
+    TestCase().assertEqual(1, sync_podcasts('urls.txt', data_path, load_changed_text_from_url, refresh=True))
+    TestCase().assertEqual([200, 304, 304, 200], PageHandler.statuses)
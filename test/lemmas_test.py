@@ -0,0 +1,40 @@
+from pathlib import Path
+from unittest import TestCase
+
+from lemmas import Lemmatizer, load_lemma_table, load_lemmatizer, default_lemma_table
+
+
+def test_lemmatizer_normalises_and_looks_up_words():
+    lemmatize = Lemmatizer({'aliments': 'aliment', 'appliquent': 'appliquer', 'à': 'à'})
+
+    TestCase().assertEqual('aliment', lemmatize('aliments'))
+    TestCase().assertEqual('appliquer', lemmatize('appliquent'))
+    TestCase().assertEqual('à', lemmatize('à'))
+    TestCase().assertEqual('aliment', lemmatize('l’aliments'))
+    TestCase().assertEqual('appliquer', lemmatize('qu’appliquent'))
+    TestCase().assertEqual('aujourd’hui', lemmatize('aujourd’hui'))
+    TestCase().assertEqual('inconnu', lemmatize('inconnu'))
+
+
+def test_lemmatizer_adds_up_the_counts_of_a_lemma():
+    lemmatize = Lemmatizer({'aliments': 'aliment'})
+
+    TestCase().assertEqual({'aliment': 5, 'de': 1}, lemmatize.word_count({'aliment': 2, 'aliments': 1, 'l’aliment': 2,
+                                                                          'de': 1}))
+
+
+def test_lemma_table_skips_comments(tmpdir):
+    table_file = Path(tmpdir) / 'lemmas.tsv'
+    table_file.write_text('# form\tlemma\n\naliments\taliment\nété\têtre\n', encoding='utf-8')
+
+    TestCase().assertEqual({'aliments': 'aliment', 'été': 'être'}, load_lemma_table(table_file))
+
+
+def test_shipped_lemma_table_loads():
+    lemmatize = load_lemmatizer(default_lemma_table)
+
+    TestCase().assertEqual('être', lemmatize('sont'))
+    TestCase().assertEqual('aliment', lemmatize('aliments'))
+    # été is more often the summer than a form of être
+    TestCase().assertEqual('été', lemmatize('été'))
+    TestCase().assertTrue(lemmatize.name.startswith('lemmas.tsv:'))
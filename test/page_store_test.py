@@ -0,0 +1,48 @@
+import os
+from unittest import TestCase
+
+from page_store import ChunkStore, compress_text, decompress_text, split_chunks
+
+
+def test_split_chunks_keeps_the_text():
+    text = ''.join(f'<div id="{i}">ligne {i}</div>\n' for i in range(1000)) + 'fin'
+    chunks = split_chunks(text)
+
+    TestCase().assertEqual(text, ''.join(chunks))
+    TestCase().assertTrue(1 < len(chunks) < 1000)
+    TestCase().assertEqual([], split_chunks(''))
+
+
+def test_chunks_line_up_after_a_change():
+    lines = [f'<div id="{i}">ligne {i}</div>\n' for i in range(1000)]
+    changed = lines[:10] + ['<div>autre chose</div>\n'] + lines[11:]
+
+    chunks, changed_chunks = split_chunks(''.join(lines)), split_chunks(''.join(changed))
+    TestCase().assertEqual(1, len(set(changed_chunks) - set(chunks)))
+
+
+def test_chunk_store_stores_a_chunk_once(tmp_path):
+    store = ChunkStore(tmp_path)
+    keys = store.put_text('<header>\n' * 300 + '<p>une page</p>\n')
+    other_keys = store.put_text('<header>\n' * 300 + '<p>une autre page</p>\n')
+
+    TestCase().assertEqual('<header>\n' * 300 + '<p>une page</p>\n', store.get_text(keys))
+    TestCase().assertEqual(keys[:-1], other_keys[:-1])
+    stored = [file for _, _, files in os.walk(tmp_path) for file in files]
+    TestCase().assertEqual(len(set(keys + other_keys)), len(stored))
+    TestCase().assertEqual('', store.get_text(store.put_text('')))
+
+
+def test_compress_text():
+    TestCase().assertEqual('Être ou ne pas être', decompress_text(compress_text('Être ou ne pas être')))
+
+
+def test_sweep_removes_the_chunks_that_are_not_used(tmp_path):
+    store = ChunkStore(tmp_path)
+    keys = store.put_text('<header>\n' * 300 + '<p>une page</p>\n')
+    old_keys = store.put_text('<p>une vieille page</p>\n')
+
+    TestCase().assertEqual(len(old_keys), store.sweep(set(keys)))
+    TestCase().assertEqual('<header>\n' * 300 + '<p>une page</p>\n', store.get_text(keys))
+    TestCase().assertFalse(os.path.exists(store.chunk_path(old_keys[0])))
+    TestCase().assertEqual(0, ChunkStore(tmp_path / 'missing').sweep(set()))
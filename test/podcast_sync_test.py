@@ -0,0 +1,116 @@
+import os
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+from unittest import TestCase
+
+import pytest
+
+from http_cache import HttpCache
+from podcast_sync import sync_podcasts_concurrently, HostRateLimiter
+from word_counter import Article, write_article
+
+page = """
+  <section>
+      <h2>Transcription de l'épisode</h2>
+        <p>
+        Bonjour épisode {episode}
+        </p>
+  </section>
+"""
+
+login_page = """
+  <section>
+      <h2>Connexion</h2>
+  </section>
+"""
+
+
+class PodcastHandler(BaseHTTPRequestHandler):
+    requests_per_path = dict()
+    failures_per_path = dict()
+
+    def do_GET(self):
+        PodcastHandler.requests_per_path[self.path] = PodcastHandler.requests_per_path.get(self.path, 0) + 1
+        if PodcastHandler.failures_per_path.get(self.path, 0) > 0:
+            PodcastHandler.failures_per_path[self.path] -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        episode = self.path.strip('/').split('-')[0]
+        body = page.format(episode=episode) if 'secret' in self.headers.get('Cookie', '') else login_page
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.end_headers()
+        self.wfile.write(body.encode('utf-8'))
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def podcast_server(http_server):
+    PodcastHandler.requests_per_path = dict()
+    PodcastHandler.failures_per_path = dict()
+    return http_server(PodcastHandler)
+
+
+def write_urls(data_path: Path, base_url, episodes):
+    os.makedirs(data_path / 'articles', exist_ok=True)
+    with open(data_path / 'urls.txt', 'w') as file:
+        file.writelines(f'{base_url}/{episode:02d}-episode/\n' for episode in episodes)
+
+
+def test_podcasts_are_synced_concurrently(tmpdir, podcast_server):
+    data_path = Path(tmpdir)
+    write_urls(data_path, podcast_server, [1, 2, 3, 4])
+    write_article(Article('/x/1', '', 1, {'bonjour': 1}), data_path / 'articles')
+    PodcastHandler.failures_per_path['/03-episode/'] = 2
+
+    synced = sync_podcasts_concurrently('urls.txt', data_path, jobs=3, requests_per_second=0, backoff=0.01,
+                                        userdata='secret')
+
+    TestCase().assertEqual(3, synced)
+    TestCase().assertNotIn('/01-episode/', PodcastHandler.requests_per_path)
+    TestCase().assertEqual(3, PodcastHandler.requests_per_path['/03-episode/'])
+    for episode in [2, 3, 4]:
+        TestCase().assertTrue(os.path.exists(data_path / 'articles' / f'{episode}.json'))
+        TestCase().assertIsNotNone(HttpCache(data_path / 'http_cache').headers(f'{podcast_server}/{episode:02d}-episode/'))
+
+
+def test_sync_gives_up_after_retries(tmpdir, podcast_server):
+    data_path = Path(tmpdir)
+    write_urls(data_path, podcast_server, [1])
+    PodcastHandler.failures_per_path['/01-episode/'] = 5
+
+    with pytest.raises(IOError):
+        sync_podcasts_concurrently('urls.txt', data_path, jobs=2, requests_per_second=0, retries=2, backoff=0.01,
+                                   userdata='secret')
+    TestCase().assertEqual(3, PodcastHandler.requests_per_path['/01-episode/'])
+
+
+def test_sync_stops_when_credentials_are_invalid(tmpdir, podcast_server):
+    data_path = Path(tmpdir)
+    write_urls(data_path, podcast_server, [1, 2])
+
+    with pytest.raises(SystemExit):
+        sync_podcasts_concurrently('urls.txt', data_path, jobs=1, requests_per_second=0, userdata='expired')
+    TestCase().assertFalse(os.path.exists(data_path / 'articles' / '1.json'))
+
+
+def test_requests_to_the_same_host_are_spaced_out():
+    now = [100.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    rate_limiter = HostRateLimiter(4, clock=lambda: now[0], sleep=sleep)
+    for path in range(3):
+        rate_limiter.wait(f'http://example.com/{path}')
+    rate_limiter.wait('http://other.com/')
+    now[0] += 1
+    rate_limiter.wait('http://example.com/3')
+
+    TestCase().assertEqual([0.25, 0.25], sleeps)
@@ -0,0 +1,93 @@
+import sqlite3
+from pathlib import Path
+from unittest import TestCase
+
+from review_schedule import CardState, sm2, due_cards, do_review, day
+from word_exercise import Word
+
+exercise_file = Path(__file__).parent / 'test_files' / 'word_exercise_test.md'
+
+
+def test_sm2_intervals_grow_with_correct_answers():
+    state = CardState()
+    intervals = []
+    for _ in range(4):
+        state = sm2(state, 4, 0)
+        intervals.append(state.interval)
+
+    TestCase().assertEqual([1, 6, 15, 38], intervals)
+    TestCase().assertEqual(2.5, state.ease)
+    TestCase().assertEqual(38 * day, state.due)
+
+
+def test_sm2_starts_over_after_a_wrong_answer():
+    state = sm2(CardState(3, 15, 2.5, 0), 1, 100)
+
+    TestCase().assertEqual(CardState(0, 1, 1.96, 100 + day), state)
+    TestCase().assertEqual(1.3, sm2(CardState(0, 1, 1.4, 0), 0, 0).ease)
+
+
+def test_due_cards_come_in_order_of_their_due_time():
+    words = [Word('a', '1'), Word('b', '2'), Word('c', '3'), Word('d', '4'), Word('e', '5')]
+    states = {Word('a', '1'): CardState(1, 1, 2.5, 50), Word('b', '2'): CardState(1, 1, 2.5, 500),
+              Word('c', '3'): CardState(1, 1, 2.5, 20)}
+
+    heap = due_cards(words, states, 100, 1)
+
+    TestCase().assertEqual(['d', 'c', 'a'], [word.question for _, _, word in sorted(heap)])
+
+
+def test_review_only_asks_due_cards(tmpdir):
+    db_path = Path(tmpdir) / 'reviews.sqlite'
+    answers = iter(['je prends', 'wrong', 'il prend'])
+    asked = []
+
+    def ask(question):
+        asked.append(question)
+        return next(answers)
+
+    TestCase().assertEqual((2, 1), do_review(exercise_file, db_path, clock=lambda: 1000, ask=ask))
+    TestCase().assertEqual(['vous prenez?*: ', 'et lui?: ', 'et lui?: '], asked)
+
+    # nothing is due an hour later, both cards are due again two days later
+    asked.clear()
+    do_review(exercise_file, db_path, clock=lambda: 1000 + 3600, ask=ask)
+    TestCase().assertEqual([], asked)
+    answers = iter(['je prends', 'il prend'])
+    do_review(exercise_file, db_path, clock=lambda: 1000 + 2 * day, ask=ask)
+    TestCase().assertEqual(['vous prenez?*: ', 'et lui?: '], asked)
+
+    with sqlite3.connect(db_path) as connection:
+        TestCase().assertEqual(5, connection.execute('SELECT COUNT(*) FROM reviews').fetchone()[0])
+        TestCase().assertEqual((2, 6), connection.execute(
+            "SELECT repetitions, interval FROM cards WHERE question = 'vous prenez?*'").fetchone())
+    connection.close()
+
+
+def test_review_stops_at_the_end_of_the_input(tmpdir):
+    def ask(question):
+        raise EOFError
+
+    TestCase().assertEqual((0, 0), do_review(exercise_file, Path(tmpdir) / 'reviews.sqlite', ask=ask))
+
+
+def test_a_wrong_card_is_asked_again_once(tmpdir):
+    asked = []
+
+    def ask(question):
+        asked.append(question)
+        return 'wrong'
+
+    TestCase().assertEqual((0, 4), do_review(exercise_file, Path(tmpdir) / 'reviews.sqlite', clock=lambda: 1000,
+                                             ask=ask))
+    TestCase().assertEqual(['vous prenez?*: ', 'et lui?: ', 'vous prenez?*: ', 'et lui?: '], asked)
+
+
+def test_an_empty_answer_skips_the_card(tmpdir):
+    db_path = Path(tmpdir) / 'reviews.sqlite'
+    answers = iter(['', 'il prend'])
+
+    TestCase().assertEqual((1, 0), do_review(exercise_file, db_path, clock=lambda: 1000, ask=lambda _: next(answers)))
+    with sqlite3.connect(db_path) as connection:
+        TestCase().assertEqual([('et lui?',)], connection.execute('SELECT question FROM cards').fetchall())
+    connection.close()
@@ -0,0 +1,75 @@
+import os
+from pathlib import Path
+from unittest import TestCase
+
+from sentence_index import SentenceIndex, cloze, episode_deck, iter_sentences, sentence_index_is_current, \
+    sentence_index_path, write_sentence_index
+from sources import transcript_page
+from word_counter import analyze
+from word_exercise import Word
+from lemmas import Lemmatizer
+from conftest import write_test_article
+
+
+def write_two_episodes(data_path: Path):
+    write_test_article(data_path, 2, 'Le chat dort. Il aime le lait !')
+    write_test_article(data_path, 1, '[00:00:10] Bonjour, le chat mange.', 'L\'homme est là.')
+
+
+def test_iter_sentences():
+    page = transcript_page('episode', ['[00:00:10] Bonjour, <b>le</b> chat mange. L\'homme ?  Oui… Et après'])
+    TestCase().assertEqual(['Bonjour, le chat mange.', 'L’homme ?', 'Oui…', 'Et après'], list(iter_sentences(page)))
+
+
+def test_sentence_index_has_the_first_sentence_of_every_word(tmp_path):
+    write_two_episodes(tmp_path)
+    write_sentence_index(tmp_path)
+
+    with SentenceIndex(sentence_index_path(tmp_path)) as index:
+        TestCase().assertEqual('Bonjour, le chat mange.', index.sentence('chat'))
+        TestCase().assertEqual('L’homme est là.', index.sentence('l’homme'))
+        TestCase().assertEqual('Le chat dort.', index.sentence('dort'))
+        TestCase().assertEqual('Il aime le lait !', index.sentence('lait'))
+        TestCase().assertIsNone(index.sentence('chien'))
+    TestCase().assertTrue(sentence_index_is_current(tmp_path))
+
+    write_test_article(tmp_path, 3, 'Un chien.')
+    TestCase().assertFalse(sentence_index_is_current(tmp_path))
+
+
+def test_cloze():
+    TestCase().assertEqual('___ chat dort.', cloze('Le chat dort.', 'le'))
+    TestCase().assertEqual('Il aime ___ lait.', cloze('Il aime le lait.', 'le'))
+    TestCase().assertIsNone(cloze('Les chats dorment.', 'le'))
+
+
+def test_episode_deck(tmp_path):
+    write_two_episodes(tmp_path)
+    analyze(tmp_path)
+
+    deck = episode_deck(tmp_path, 2)
+    TestCase().assertEqual(sorted([Word('Le chat ___.', 'dort'), Word('___ aime le lait !', 'il'),
+                                   Word('Il ___ le lait !', 'aime'), Word('Il aime le ___ !', 'lait')]),
+                           sorted(deck))
+    TestCase().assertTrue(os.path.exists(sentence_index_path(tmp_path) / 'words.txt'))
+    TestCase().assertEqual([], episode_deck(tmp_path, 5))
+
+
+def test_sentences_are_unescaped_once(tmp_path):
+    write_test_article(tmp_path, 1, 'Le mot &lt;chat&gt; est là.')
+    write_sentence_index(tmp_path)
+
+    with SentenceIndex(sentence_index_path(tmp_path)) as index:
+        TestCase().assertEqual('Le mot &lt;chat&gt; est là.', index.sentence('&lt;chat&gt;'))
+        TestCase().assertIsNone(index.sentence('<chat>'))
+
+
+def test_episode_deck_of_lemmas(tmp_path):
+    write_two_episodes(tmp_path)
+    lemmatizer = Lemmatizer({'dort': 'dormir', 'aime': 'aimer'}, 'test')
+    analyze(tmp_path, lemmatizer=lemmatizer)
+
+    deck = episode_deck(tmp_path, 2, lemmatizer)
+    TestCase().assertIn(Word('Le chat ___.', 'dort'), deck)
+    TestCase().assertIn(Word('Il ___ le lait !', 'aime'), deck)
+    TestCase().assertEqual([], episode_deck(tmp_path, 2))
@@ -0,0 +1,145 @@
+import asyncio
+import json
+import os
+from unittest import TestCase
+
+import pytest
+
+from service import Corpus, route, start_server, watch_articles
+from word_counter import analyze
+from conftest import write_test_article
+
+
+def test_corpus_answers_from_memory(tmp_path):
+    write_test_article(tmp_path, 1, 'Le chat mange. Le chat dort.')
+    write_test_article(tmp_path, 2, 'Le chien dort.')
+    corpus = Corpus(tmp_path)
+
+    TestCase().assertEqual({'episodes': 2, 'words': 5}, corpus.stats())
+    TestCase().assertEqual({'word': 'chat', 'first_occurrence': 1, 'total': 2, 'documents': 1, 'episodes': {'1': 2}},
+                           corpus.lookup_word('Chat'))
+    TestCase().assertIsNone(corpus.lookup_word('oiseau'))
+    TestCase().assertEqual({'episode': 2, 'words': 3, 'distinct_words': 3, 'new_words': ['chien']},
+                           corpus.episode(2))
+    TestCase().assertEqual([{'question': 'Le ___ dort.', 'answer': 'chien'}], corpus.deck(2))
+    TestCase().assertIsNone(corpus.episode(3))
+    corpus.close()
+
+
+def test_corpus_adds_new_articles(tmp_path, mocker):
+    write_test_article(tmp_path, 2, 'Le chat dort.')
+    analyze(tmp_path)
+    corpus = Corpus(tmp_path)
+    TestCase().assertEqual(0, corpus.update())
+
+    write_test_article(tmp_path, 1, 'Le chat mange.')
+    load = mocker.spy(Corpus, 'load')
+    TestCase().assertEqual(1, corpus.update())
+    TestCase().assertEqual(0, load.call_count)
+    TestCase().assertEqual(1, corpus.lookup_word('chat')['first_occurrence'])
+    TestCase().assertEqual(['chat', 'le', 'mange'], corpus.episode(1)['new_words'])
+    TestCase().assertEqual(['dort'], corpus.episode(2)['new_words'])
+
+    os.remove(tmp_path / 'articles' / '2.json')
+    TestCase().assertEqual(1, corpus.update())
+    TestCase().assertEqual({'episodes': 1, 'words': 3}, corpus.stats())
+
+
+def test_route(tmp_path):
+    write_test_article(tmp_path, 1, 'Le chat mange.')
+    corpus = Corpus(tmp_path)
+
+    TestCase().assertEqual(200, asyncio.run(route(corpus, '/words/chat'))[0])
+    TestCase().assertEqual('mangé', asyncio.run(route(corpus, '/words/mang%C3%A9'))[1]['error'].split()[0])
+    TestCase().assertEqual((200, corpus.episode(1)), asyncio.run(route(corpus, '/episodes/1')))
+    TestCase().assertEqual((200, corpus.deck(1)), asyncio.run(route(corpus, '/episodes/1/deck')))
+    TestCase().assertEqual(404, asyncio.run(route(corpus, '/episodes/2/deck'))[0])
+    TestCase().assertEqual(404, asyncio.run(route(corpus, '/episodes/x'))[0])
+    TestCase().assertEqual(404, asyncio.run(route(corpus, '/other'))[0])
+    TestCase().assertEqual((200, {'episodes': 1, 'words': 3}), asyncio.run(route(corpus, '/stats?x=1')))
+    corpus.close()
+
+
+async def get(port, path):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode())
+    response = await reader.read()
+    writer.close()
+    head, body = response.split(b'\r\n\r\n', 1)
+    return head.split(b'\r\n')[0].decode(), json.loads(body)
+
+
+def test_server(tmp_path):
+    write_test_article(tmp_path, 1, 'Le chat mange.')
+    corpus = Corpus(tmp_path)
+
+    async def requests():
+        server = await start_server(corpus, port=0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await get(port, '/words/chat'), await get(port, '/missing')
+
+    found, missing = asyncio.run(requests())
+    TestCase().assertEqual(('HTTP/1.1 200 OK', corpus.lookup_word('chat')), found)
+    TestCase().assertEqual('HTTP/1.1 404 Not Found', missing[0])
+
+
+def test_decks_use_the_new_articles(tmp_path):
+    write_test_article(tmp_path, 2, 'Le chat dort.')
+    corpus = Corpus(tmp_path)
+    TestCase().assertEqual(3, len(corpus.deck(2)))
+
+    write_test_article(tmp_path, 1, 'Le chat mange.')
+    TestCase().assertEqual(1, corpus.apply(corpus.read_changes()))
+    TestCase().assertEqual([{'question': 'Le chat ___.', 'answer': 'dort'}], corpus.deck(2))
+    TestCase().assertIn({'question': 'Le ___ mange.', 'answer': 'chat'}, corpus.deck(1))
+    corpus.close()
+
+
+def test_server_only_removes_an_old_socket(tmp_path):
+    write_test_article(tmp_path, 1, 'Le chat mange.')
+    corpus = Corpus(tmp_path)
+    socket_path = str(tmp_path / 'serve.sock')
+
+    async def serve_twice():
+        for _ in range(2):
+            server = await start_server(corpus, socket_path=socket_path)
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(serve_twice())
+    with open(tmp_path / 'notes.txt', 'w') as file:
+        file.write('keep')
+    with pytest.raises(FileExistsError):
+        asyncio.run(start_server(corpus, socket_path=str(tmp_path / 'notes.txt')))
+    TestCase().assertTrue(os.path.exists(tmp_path / 'notes.txt'))
+
+
+def test_partial_articles_are_read_again_later(tmp_path, mocker):
+    write_test_article(tmp_path, 1, 'Le chat mange.')
+    corpus = Corpus(tmp_path)
+    full_article = (tmp_path / 'articles' / '1.json').read_text().replace('"/x/1"', '"/x/2"')
+    (tmp_path / 'articles' / '2.json').write_text(full_article[:30])
+
+    TestCase().assertEqual(0, corpus.update())
+    TestCase().assertEqual(1, corpus.stats()['episodes'])
+
+    write_test_article(tmp_path, 2, 'Le chien dort.')
+    # the first check fails as a whole, the watcher goes on with the next ones
+    failures = [OSError('busy')]
+
+    def read_changes():
+        if failures:
+            raise failures.pop()
+        return Corpus.read_changes(corpus)
+
+    read_changes = mocker.patch.object(corpus, 'read_changes', side_effect=read_changes)
+
+    async def watch():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(watch_articles(corpus, 0.01), 0.2)
+
+    asyncio.run(watch())
+    TestCase().assertGreaterEqual(read_changes.call_count, 2)
+    TestCase().assertEqual(2, corpus.stats()['episodes'])
+    corpus.close()
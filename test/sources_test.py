@@ -0,0 +1,124 @@
+import json
+import os
+import shutil
+import zipfile
+from pathlib import Path
+from unittest import TestCase
+
+from sources import LocalFilesSource, InnerFrenchSource, sync_source, html_paragraphs, text_paragraphs, \
+    srt_paragraphs, transcript_page
+from word_counter import process_file_data
+
+test_files = Path(__file__).parent / 'test_files'
+
+
+def test_html_paragraphs_skip_scripts_and_split_blocks():
+    page = """<html><head><title>titre</title><style>p {}</style></head>
+      <body><h1>Le titre</h1><div>Bonjour <b>à</b> tous<br>et &amp; bienvenue</div>
+      <script>var x = 1;</script><ul><li>un</li><li>deux</li></ul></body></html>"""
+
+    TestCase().assertEqual(['Le titre', 'Bonjour à tous', 'et & bienvenue', 'un', 'deux'], html_paragraphs(page))
+
+
+def test_text_paragraphs_are_separated_by_empty_lines():
+    TestCase().assertEqual(['Il était une fois une langue.', 'Fin.'],
+                           text_paragraphs('Il était une fois\nune langue.\n\n  \n\nFin.\n'))
+
+
+def test_srt_paragraphs_leave_out_numbers_and_times():
+    subtitles = ('1\r\n00:00:01,000 --> 00:00:03,500\r\n<i>Bonjour</i> à tous\r\n\r\n'
+                 '2\r\n00:00:04,000 --> 00:00:05,000\r\n{\\an8}Ça va ?\r\nOui.\r\n')
+
+    TestCase().assertEqual(['Bonjour à tous', 'Ça va ? Oui.'], srt_paragraphs(subtitles))
+
+
+def test_transcript_page_is_read_by_process_file_data():
+    page = transcript_page('livre <1>', ['Bonjour à tous.', 'Bonjour <les> amis & co'])
+
+    TestCase().assertEqual({'bonjour': 2, 'à': 1, 'tous': 1, '<les>': 1, 'amis': 1, 'co': 1}, process_file_data(page))
+
+
+def write_epub(path: Path, chapters: dict[str, str]):
+    with zipfile.ZipFile(path, 'w') as book:
+        book.writestr('mimetype', 'application/epub+zip')
+        book.writestr('META-INF/container.xml', """<?xml version="1.0"?>
+            <container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+              <rootfiles><rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/></rootfiles>
+            </container>""")
+        items = ''.join(f'<item id="c{i}" href="{name}" media-type="application/xhtml+xml"/>'
+                        for i, name in enumerate(chapters.keys()))
+        # the spine lists the chapters in reverse, the reading order is the order of the spine
+        spine = ''.join(f'<itemref idref="c{i}"/>' for i in reversed(range(len(chapters))))
+        book.writestr('OEBPS/content.opf', f"""<?xml version="1.0"?>
+            <package xmlns="http://www.idpf.org/2007/opf" version="3.0">
+              <manifest>{items}</manifest><spine>{spine}</spine>
+            </package>""")
+        for name, text in chapters.items():
+            book.writestr(f'OEBPS/{name}', f'<html><body><p>{text}</p></body></html>')
+
+
+def test_local_files_are_numbered_in_the_order_of_their_paths(tmpdir):
+    folder = Path(tmpdir) / 'books'
+    os.makedirs(folder / 'sub')
+    (folder / 'a.txt').write_text('Bonjour.', encoding='utf-8')
+    (folder / 'sub' / 'c.srt').write_text('1\n00:00:01,000 --> 00:00:02,000\nSalut\n', encoding='utf-8')
+    (folder / 'notes.md').write_text('not read', encoding='utf-8')
+    write_epub(folder / 'b.epub', {'one.xhtml': 'Premier chapitre', 'two.xhtml': 'Deuxième chapitre'})
+
+    documents = list(LocalFilesSource([folder], 10).documents())
+
+    TestCase().assertEqual([(str(folder / 'a.txt'), 10), (f'{folder / "b.epub"}#OEBPS/two.xhtml', 11),
+                            (f'{folder / "b.epub"}#OEBPS/one.xhtml', 12), (str(folder / 'sub' / 'c.srt'), 13)],
+                           [(document.name, document.sequence_number) for document in documents])
+    TestCase().assertEqual({'deuxième': 1, 'chapitre': 1}, process_file_data(documents[1].load()))
+    TestCase().assertEqual({'salut': 1}, process_file_data(documents[3].load()))
+
+
+def test_unsupported_files_are_reported(tmpdir):
+    (Path(tmpdir) / 'notes.md').write_text('', encoding='utf-8')
+
+    with TestCase().assertRaises(ValueError):
+        list(LocalFilesSource([Path(tmpdir) / 'notes.md']).documents())
+
+
+def test_sources_are_synced_to_articles(tmpdir):
+    data_path = Path(tmpdir) / 'data'
+    (Path(tmpdir) / 'a.txt').write_text('Le chat et le chien.', encoding='utf-8')
+    (Path(tmpdir) / 'empty.txt').write_text('  ', encoding='utf-8')
+    source = LocalFilesSource([Path(tmpdir) / 'a.txt', Path(tmpdir) / 'empty.txt'], 500)
+
+    TestCase().assertEqual(1, sync_source(source, data_path))
+    with open(data_path / 'articles' / '500.json', 'r', encoding='utf-8') as file:
+        article = json.load(file)
+    TestCase().assertEqual({'le': 2, 'chat': 1, 'et': 1, 'chien': 1}, article['word_count'])
+    TestCase().assertEqual(0, sync_source(source, data_path))
+
+
+def test_imported_documents_keep_their_numbers(tmpdir):
+    data_path = Path(tmpdir) / 'data'
+    folder = Path(tmpdir) / 'texts'
+    os.makedirs(folder)
+    os.makedirs(data_path)
+    (folder / 'a.txt').write_text('Un.', encoding='utf-8')
+    (folder / 'c.txt').write_text('Trois.', encoding='utf-8')
+    TestCase().assertEqual(2, sync_source(LocalFilesSource([folder], 1000, data_path / 'numbers.json'), data_path))
+
+    (folder / 'b.txt').write_text('Deux.', encoding='utf-8')
+    TestCase().assertEqual(1, sync_source(LocalFilesSource([folder], 1000, data_path / 'numbers.json'), data_path))
+
+    word_counts = dict()
+    for file_name in [f for f in os.listdir(data_path / 'articles') if f.endswith('.json')]:
+        with open(data_path / 'articles' / file_name, 'r', encoding='utf-8') as file:
+            word_counts[file_name] = json.load(file)['word_count']
+    TestCase().assertEqual({'1000.json': {'un': 1}, '1001.json': {'trois': 1}, '1002.json': {'deux': 1}},
+                           word_counts)
+
+
+def test_inner_french_source_numbers_episodes_by_their_name(tmpdir):
+    shutil.copy(test_files / 'urls.txt', tmpdir)
+
+    documents = list(InnerFrenchSource('urls.txt', Path(tmpdir), lambda url, path: url).documents())
+
+    TestCase().assertEqual([('x/1-test.json', 1), ('x/2-test.json', 2)],
+                           [(document.name, document.sequence_number) for document in documents])
+    TestCase().assertEqual('x/2-test.json', documents[1].load())
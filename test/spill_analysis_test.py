@@ -0,0 +1,58 @@
+import os
+import shutil
+from pathlib import Path
+from unittest import TestCase
+
+import spill_analysis
+from spill_analysis import SpillSorter, analyze_with_spill_files
+from word_counter import Article, analyze, write_article
+from word_index import WordIndex
+
+test_files = Path(__file__).parent / 'test_files'
+
+
+def test_spill_sorter_merges_its_runs(tmpdir, mocker):
+    mocker.patch.object(spill_analysis, 'max_open_runs', 3)
+    mocker.patch.object(spill_analysis, 'sample_interval', 1)
+    sorter = SpillSorter(Path(tmpdir), 'test', 500)
+    items = [(f'mot{i % 17}', (i * 7919) % 101) for i in range(200)]
+    for item in items:
+        sorter.add(item)
+
+    TestCase().assertTrue(len(sorter.runs) > 3)
+    TestCase().assertEqual(sorted(items), list(sorter))
+    TestCase().assertTrue(len(sorter.runs) <= 3)
+
+
+def test_spill_sorter_sorts_in_memory_below_the_limit(tmpdir):
+    sorter = SpillSorter(Path(tmpdir), 'test', 1000000)
+    for item in [(2, 'b'), (1, 'z'), (2, 'a')]:
+        sorter.add(item)
+
+    TestCase().assertEqual([(1, 'z'), (2, 'a'), (2, 'b')], list(sorter))
+    TestCase().assertEqual([], os.listdir(tmpdir))
+
+
+def read_outputs(data_path: Path):
+    outputs = {file_name: (data_path / file_name).read_bytes()
+               for file_name in ['first_occurrences.json', 'word_frequencies.json', 'episode_counts.json']}
+    with WordIndex(data_path / 'index') as index:
+        outputs['index'] = index.postings()
+    return outputs
+
+
+def test_spill_files_give_the_same_analysis(tmpdir, mocker):
+    data_path = Path(tmpdir)
+    os.makedirs(data_path / 'articles')
+    shutil.copy(test_files / '1.json', data_path / 'articles' / '1.json')
+    shutil.copy(test_files / '2-test.json', data_path / 'articles' / '2.json')
+    write_article(Article('/x/3', '', 3, {'nouveau': 2, 'robots': 1}), data_path / 'articles')
+    analyze(data_path)
+    expected = read_outputs(data_path)
+
+    mocker.patch.object(spill_analysis, 'max_open_runs', 4)
+    analyze_with_spill_files(data_path, 20000)
+
+    TestCase().assertEqual(expected, read_outputs(data_path))
+    TestCase().assertEqual(['1.json', '2.json', '3.json'], sorted(os.listdir(data_path / 'articles')))
+    TestCase().assertFalse(os.path.exists(data_path / 'first_occurrences_state.json'))
@@ -0,0 +1,84 @@
+from unittest import TestCase
+
+import threading
+import time
+
+import pytest
+
+import timings
+from word_counter import process_file_data
+
+
+@pytest.fixture(autouse=True)
+def clean_timings():
+    # the timers are module globals, every test starts and ends without them
+    timings.disable()
+    timings.reset()
+    yield
+    timings.disable()
+    timings.reset()
+
+
+def test_stages_are_timed_and_counted_when_enabled():
+    page = """
+      <section>
+          <h2>Transcription de l'épisode</h2>
+            <p>Bonjour à tous</p>
+            <p>Bonjour</p>
+      </section>
+    """
+    process_file_data(page)
+    TestCase().assertEqual({}, timings.summary()['stages'])
+
+    timings.enable()
+    process_file_data(page)
+    summary = timings.summary()
+
+    TestCase().assertEqual({'sections', 'normalise', 'tokenise'}, set(summary['stages'].keys()))
+    TestCase().assertEqual(1, summary['stages']['sections']['calls'])
+    TestCase().assertEqual(2, summary['stages']['normalise']['calls'])
+    TestCase().assertEqual({'pages': 1, 'page characters': len(page), 'paragraphs': 2, 'words': 4},
+                           summary['counters'])
+    TestCase().assertEqual(2, summary['rates']['paragraphs per page'])
+
+
+def test_nested_stages_are_not_counted_twice():
+    @timings.timed('inner')
+    def inner():
+        time.sleep(0.02)
+
+    @timings.timed('outer')
+    def outer():
+        inner()
+        inner()
+
+    timings.enable()
+    outer()
+    summary = timings.summary()
+
+    TestCase().assertGreaterEqual(summary['stages']['inner']['seconds'], 0.04)
+    TestCase().assertLess(summary['stages']['outer']['seconds'], 0.02)
+
+
+def test_stages_in_other_threads_are_not_subtracted():
+    started = threading.Event()
+
+    @timings.timed('download')
+    def download():
+        started.set()
+        time.sleep(0.1)
+
+    @timings.timed('json io')
+    def write():
+        started.wait()
+        time.sleep(0.2)
+
+    timings.enable()
+    thread = threading.Thread(target=download)
+    thread.start()
+    write()
+    thread.join()
+    summary = timings.summary()
+
+    TestCase().assertGreaterEqual(summary['stages']['json io']['seconds'], 0.2)
+    TestCase().assertGreaterEqual(summary['stages']['download']['seconds'], 0.1)
@@ -0,0 +1,54 @@
+import json
+from pathlib import Path
+from unittest import TestCase
+
+import pytest
+
+from transcript_parser import count_words_in_chunks, iter_chunks, iter_transcript_paragraphs, \
+    transcript_page_from_chunks
+from word_counter import process_file_data, extract_p_sections, extract_transcription_section, extract_sections
+
+test_files = Path(__file__).parent / 'test_files'
+
+
+def load_page(file_name):
+    with open(test_files / file_name, 'r', encoding='utf-8') as file:
+        return json.load(file)['text']
+
+
+def test_paragraphs_are_found_while_the_page_is_fed_in_chunks():
+    data = """
+      <section class="elementor-section type="section">
+          <p>not this one</p>
+      </section>
+      <section>
+          <p>before the title</p>
+          <h2>Transcription de l'épisode</h2>
+            <p>Bonjour <strong>troisième</strong> &amp; épisode</p>
+      </section>
+      <section><p>not this one either</p></section>
+    """
+    for chunk_size in [1, 5, 1000]:
+        TestCase().assertEqual(['<p>before the title</p>', '<p>Bonjour <strong>troisième</strong> &amp; épisode</p>'],
+                               list(iter_transcript_paragraphs(iter_chunks(data, chunk_size))))
+
+
+def test_streamed_word_counts_match_process_file_data():
+    for file_name in ['1.json', '2-test.json']:
+        page = load_page(file_name)
+        expected_paragraphs = extract_p_sections(extract_transcription_section(extract_sections(page)))
+        TestCase().assertEqual(expected_paragraphs, list(iter_transcript_paragraphs(iter_chunks(page, 4096))))
+        TestCase().assertEqual(process_file_data(page), count_words_in_chunks(iter_chunks(page, 333)))
+
+
+def test_transcript_page_gives_the_same_word_counts_as_the_full_page():
+    page = load_page('2-test.json')
+    transcript_page = transcript_page_from_chunks(iter_chunks(page))
+
+    TestCase().assertLess(len(transcript_page), len(page) / 4)
+    TestCase().assertEqual(process_file_data(page), process_file_data(transcript_page))
+
+
+def test_missing_transcription_stops_processing():
+    with pytest.raises(SystemExit):
+        count_words_in_chunks(iter_chunks('<section><h2>Connexion</h2><p>mot de passe</p></section>'))
@@ -4,11 +4,18 @@ import shutil
 from pathlib import Path
 from unittest import TestCase
 
+import pytest
+
 from word_counter import split_words, group_words, Article, extract_transcription_section, \
     extract_sections, extract_p_sections, extract_text_from_p_section, extract_text_from_all_p_sections, \
     group_words_in_list, sync_podcasts, get_sequence_number_from_url_or_file, process_file_data, sum_counts, \
     word_occurs_first_in, analyze_articles, remove_junk_words, unescape, \
-    WordCount
+    WordCount, tokenize, write_article, analyze, re_load, LazyArticle, load_article, word_frequencies, WordFrequencies, \
+    write_first_occurrences, plot_word_counts, rolling_average, split_page, restore_page, normalise_word, \
+    sweep_chunks
+from lemmas import Lemmatizer
+import word_counter
+from conftest import write_test_articles
 
 
 def test_remove_junk():
@@ -26,6 +33,12 @@ def test_split_words():
     TestCase().assertListEqual(['vous…', 'salut', 'à', 'tous', 'bam'], words)
 
 
+def test_tokenize_keeps_elisions_and_compounds_together():
+    words = list(tokenize("L’homme est-il bien-être - 1500€ 3e *** & aujourd’hui"))
+    TestCase().assertListEqual(['l’homme', 'est-il', 'bien-être', 'aujourd’hui'], words)
+    TestCase().assertEqual('aujourd’hui l’homme', extract_text_from_p_section("<p>aujourd'hui l’homme</p>"))
+
+
 def test_group_words_in_list():
     data = [
         """Bonjour Podcast Podcast""",
@@ -265,6 +278,9 @@ def test_word_counts_are_summed_correctly():
     TestCase().assertEqual(1, word_counts.get('onlyinone'))
     TestCase().assertEqual(1, word_counts.get('onlyintwo'))
 
+    word_counts = sum_counts([Article('/x/1', '', 1, {'un': 3}), Article('/x/2', '', 2, {'un': 2, 'deux': 2})])
+    TestCase().assertEqual({'un': 5, 'deux': 2}, word_counts)
+
 
 def test_word_occurs_first():
     file1 = """
@@ -330,3 +346,237 @@ def test_new_words_report():
 def test_html_characters_are_unescaped():
     data = 'l&#8217;imaginez'
     TestCase().assertEqual('l’imaginez', unescape(data))
+
+
+def test_new_words_report_matches_first_occurrence_of_each_word():
+    articles = [
+        Article('/x/3', '', 3, {'trois': 1, 'un': 2}),
+        Article('/x/1', '', 1, {'un': 1, 'deux': 1}),
+        Article('/x/2', '', 2, {'deux': 4, 'zéro': 1, 'trois': 1}),
+    ]
+
+    report = analyze_articles(articles)
+
+    TestCase().assertEqual([WordCount(1, 2, ['deux', 'un']), WordCount(2, 2, ['trois', 'zéro'])], report)
+    for word_count in report:
+        for word in word_count.words:
+            TestCase().assertEqual(word_count.episode, word_occurs_first_in(word, articles))
+
+
+def test_incremental_analyze_only_loads_new_articles(tmpdir, mocker):
+    data_path = Path(tmpdir)
+    write_test_articles(data_path, [Article('/x/2', '', 2, {'deux': 1, 'trois': 1}),
+                                    Article('/x/3', '', 3, {'trois': 1, 'quatre': 1})])
+    analyze(data_path)
+
+    # a backfilled episode that is older than the ones already analyzed
+    write_test_articles(data_path, [Article('/x/1', '', 1, {'un': 1, 'trois': 1})])
+    load_lazy_article = mocker.spy(word_counter, 'load_lazy_article')
+    first_occurrences = analyze(data_path, incremental=True)
+
+    TestCase().assertEqual(1, load_lazy_article.call_count)
+    TestCase().assertEqual([WordCount(1, 2, ['trois', 'un']), WordCount(2, 1, ['deux']), WordCount(3, 1, ['quatre'])],
+                           first_occurrences)
+    with open(data_path / 'first_occurrences.json', 'r') as file:
+        TestCase().assertEqual(first_occurrences, [WordCount.from_dict(item) for item in json.load(file)])
+
+
+def test_incremental_analyze_starts_over_when_an_article_changes(tmpdir):
+    data_path = Path(tmpdir)
+    write_test_articles(data_path, [Article('/x/1', '', 1, {'un': 1, 'deux': 1}),
+                                    Article('/x/2', '', 2, {'deux': 1})])
+    analyze(data_path)
+
+    write_test_articles(data_path, [Article('/x/1', '', 1, {'un': 1})])
+    first_occurrences = analyze(data_path, incremental=True)
+
+    TestCase().assertEqual([WordCount(1, 1, ['un']), WordCount(2, 1, ['deux'])], first_occurrences)
+
+
+def test_word_counts_of_test_pages_do_not_change():
+    test_files = Path(__file__).parent / 'test_files'
+    with open(test_files / 'word_counts.json', 'r', encoding='utf-8') as file:
+        expected_word_counts = json.load(file)
+
+    for file_name, expected_word_count in expected_word_counts.items():
+        with open(test_files / file_name, 'r', encoding='utf-8') as file:
+            page = file.read()
+        if file_name.endswith('.json'):
+            page = json.loads(page)['text']
+        TestCase().assertEqual(expected_word_count, process_file_data(page))
+
+
+def test_parallel_reload_writes_the_same_files(tmpdir):
+    data_path = Path(tmpdir)
+    os.makedirs(data_path / 'articles')
+    shutil.copy(Path(__file__).parent / 'test_files' / '1.json', data_path / 'articles' / '1.json')
+    shutil.copy(Path(__file__).parent / 'test_files' / '2-test.json', data_path / 'articles' / '2.json')
+
+    re_load(data_path)
+    serial_files = {f: (data_path / 'articles' / f).read_bytes() for f in ['1.json', '2.json']}
+    shutil.copy(Path(__file__).parent / 'test_files' / '2-test.json', data_path / 'articles' / '2.json')
+    shutil.copy(Path(__file__).parent / 'test_files' / '1.json', data_path / 'articles' / '1.json')
+
+    re_load(data_path, jobs=2)
+
+    for file_name, serial_file in serial_files.items():
+        TestCase().assertEqual(serial_file, (data_path / 'articles' / file_name).read_bytes())
+
+
+def test_lazy_article_reads_the_text_when_it_is_used(tmpdir):
+    for file_name in ['1.json', '2-test.json']:
+        article = load_article(Path(__file__).parent / 'test_files' / file_name)
+        lazy_article = LazyArticle(Path(__file__).parent / 'test_files' / file_name)
+
+        TestCase().assertEqual(article.file_name, lazy_article.file_name)
+        TestCase().assertEqual(article.sequence_number, lazy_article.sequence_number)
+        TestCase().assertEqual(article.word_count, lazy_article.word_count)
+        TestCase().assertEqual(article.text, lazy_article.text)
+
+    with open(tmpdir / '3.json', 'w') as file:
+        file.write(json.dumps({'sequence_number': 3, 'word_count': {'trois': 1}, 'text': 'x', 'file_name': '/x/3'}))
+    lazy_article = LazyArticle(tmpdir / '3.json')
+    TestCase().assertEqual((3, {'trois': 1}, 'x'), (lazy_article.sequence_number, lazy_article.word_count,
+                                                    lazy_article.text))
+
+
+def test_lazy_article_reads_a_word_named_like_a_key(tmpdir):
+    data_path = Path(tmpdir)
+    page = load_article(Path(__file__).parent / 'test_files' / '1.json')
+    write_article(Article('/x/5', page.text, 5, {'le': 1, 'sequence_number': 2}), data_path)
+    with open(data_path / '6.json', 'w') as file:
+        file.write(json.dumps({'file_name': '/x/6', 'text': 'x', 'sequence_number': 6,
+                               'word_count': {'x': 1, 'sequence_number': 1}}))
+
+    for file_name in ['5.json', '6.json']:
+        article = load_article(data_path / file_name)
+        lazy_article = LazyArticle(data_path / file_name)
+        TestCase().assertEqual((article.sequence_number, article.word_count, article.text),
+                               (lazy_article.sequence_number, lazy_article.word_count, lazy_article.text))
+        # the offsets are found, the file isn't parsed as a whole
+        TestCase().assertIsNotNone(lazy_article.text_start)
+
+
+def test_an_empty_article_file_gives_the_json_error(tmpdir):
+    open(tmpdir / '4.json', 'w').close()
+
+    with pytest.raises(json.JSONDecodeError):
+        load_article(tmpdir / '4.json')
+    with pytest.raises(json.JSONDecodeError):
+        LazyArticle(tmpdir / '4.json')
+
+
+def test_articles_store_the_transcription_section(tmpdir):
+    data_path = Path(tmpdir)
+    page = load_article(Path(__file__).parent / 'test_files' / '1.json')
+    write_article(page, data_path)
+
+    _, section, _ = split_page(page.text)
+    article = load_article(data_path / '1.json')
+    TestCase().assertEqual(section, article.text)
+    TestCase().assertEqual(section, LazyArticle(data_path / '1.json').text)
+    TestCase().assertEqual((page.file_name, page.sequence_number, page.word_count),
+                           (article.file_name, article.sequence_number, article.word_count))
+    TestCase().assertEqual(process_file_data(page.text), process_file_data(article.text))
+    TestCase().assertEqual(page.text, restore_page(data_path / '1.json'))
+    TestCase().assertLess(os.path.getsize(data_path / '1.json') * 10,
+                          os.path.getsize(Path(__file__).parent / 'test_files' / '1.json'))
+
+
+def test_articles_without_transcription_are_stored_whole(tmpdir):
+    write_article(Article('/x/3', 'pas de transcription', 3, {'trois': 1}), Path(tmpdir))
+
+    TestCase().assertEqual('pas de transcription', load_article(Path(tmpdir) / '3.json').text)
+    TestCase().assertEqual('pas de transcription', restore_page(Path(tmpdir) / '3.json'))
+
+
+def test_word_frequencies():
+    frequencies = word_frequencies([Article('/x/1', '', 1, {'un': 3, 'et': 1}),
+                                    Article('/x/2', '', 2, {'deux': 2, 'et': 4})])
+
+    TestCase().assertEqual({'un': 3, 'et': 5, 'deux': 2}, frequencies.total)
+    TestCase().assertEqual({'un': 1, 'et': 2, 'deux': 1}, frequencies.documents)
+    TestCase().assertEqual({1: {'words': 4, 'distinct': 2}, 2: {'words': 6, 'distinct': 2}}, frequencies.episodes)
+    TestCase().assertEqual(4, frequencies.episode_count('et', 2))
+    TestCase().assertEqual(0, frequencies.episode_count('un', 2))
+    TestCase().assertEqual(4 / 6, frequencies.episode_frequency('et', 2))
+    TestCase().assertEqual([{'word': 'et', 'total': 5, 'documents': 2}, {'word': 'un', 'total': 3, 'documents': 1},
+                            {'word': 'deux', 'total': 2, 'documents': 1}], frequencies.to_dict()['words'])
+    TestCase().assertEqual(frequencies.to_dict(), WordFrequencies.from_dict(frequencies.to_dict()).to_dict())
+
+
+def test_incremental_analyze_updates_word_frequencies(tmpdir):
+    data_path = Path(tmpdir)
+    write_test_articles(data_path, [Article('/x/2', '', 2, {'deux': 1, 'et': 2})])
+    analyze(data_path)
+    write_test_articles(data_path, [Article('/x/1', '', 1, {'un': 1, 'et': 1})])
+    analyze(data_path, incremental=True)
+    with open(data_path / 'word_frequencies.json', 'r') as file:
+        incremental_frequencies = json.load(file)
+
+    analyze(data_path)
+    with open(data_path / 'word_frequencies.json', 'r') as file:
+        TestCase().assertEqual(json.load(file), incremental_frequencies)
+    TestCase().assertEqual({'word': 'et', 'total': 3, 'documents': 2}, incremental_frequencies['words'][0])
+
+
+def test_analyze_with_lemmas_counts_new_lemmas(tmpdir):
+    data_path = Path(tmpdir)
+    write_test_articles(data_path, [Article('/x/1', '', 1, {'aliment': 1, 'appliquer': 1}),
+                                    Article('/x/2', '', 2, {'aliments': 2, 'appliquent': 1, 'nouveau': 1})])
+    lemmatizer = Lemmatizer({'aliments': 'aliment', 'appliquent': 'appliquer'}, 'test')
+
+    first_occurrences = analyze(data_path, lemmatizer=lemmatizer)
+
+    TestCase().assertEqual([WordCount(1, 2, ['aliment', 'appliquer']), WordCount(2, 1, ['nouveau'])],
+                           first_occurrences)
+    with open(data_path / 'word_frequencies.json', 'r') as file:
+        TestCase().assertEqual({'word': 'aliment', 'total': 3, 'documents': 2}, json.load(file)['words'][0])
+
+    # the stored state holds lemmas, an incremental run without them has to start over
+    TestCase().assertEqual([WordCount(1, 2, ['aliment', 'appliquer']), WordCount(2, 3, ['aliments', 'appliquent',
+                                                                                       'nouveau'])],
+                           analyze(data_path, incremental=True))
+
+
+def test_rolling_average_of_the_first_episodes_uses_the_episodes_so_far():
+    TestCase().assertEqual([2, 3, 4, 6], rolling_average([2, 4, 6, 8], 3))
+
+
+def test_plot_is_only_rendered_when_the_counts_change(tmpdir):
+    data_path = Path(tmpdir)
+    output_file = data_path / 'plot.png'
+    write_first_occurrences(data_path, [WordCount(1, 2, ['deux', 'un']), WordCount(2, 1, ['trois'])])
+    with open(data_path / 'episode_counts.json', 'r') as file:
+        TestCase().assertEqual([{'episode': 1, 'count': 2}, {'episode': 2, 'count': 1}], json.load(file))
+
+    plot_word_counts(data_path, output_file)
+    rendered = os.stat(output_file).st_mtime_ns
+    plot_word_counts(data_path, output_file)
+    TestCase().assertEqual(rendered, os.stat(output_file).st_mtime_ns)
+
+    write_first_occurrences(data_path, [WordCount(1, 2, ['deux', 'un']), WordCount(2, 2, ['quatre', 'trois'])])
+    plot_word_counts(data_path, output_file)
+    TestCase().assertNotEqual(rendered, os.stat(output_file).st_mtime_ns)
+
+
+def test_words_are_nfc_normalised_without_lemmas():
+    decomposed = '<p>e\u0301te\u0301 l\'e\u0301te\u0301</p>'
+
+    TestCase().assertEqual({'\u00e9t\u00e9': 1, 'l\u2019\u00e9t\u00e9': 1},
+                           group_words_in_list([extract_text_from_p_section(decomposed)]))
+    TestCase().assertEqual('l\u2019\u00e9t\u00e9', normalise_word('L\'E\u0301te\u0301'))
+
+
+def test_sweep_chunks_keeps_the_chunks_of_the_articles(tmpdir):
+    data_path = Path(tmpdir)
+    section = '<section><h2>Transcription de l’épisode</h2><p>un</p></section>'
+    write_article(Article('/x/1', '<header>ancien</header>\n' + section, 1, {'un': 1}), data_path)
+    write_article(Article('/x/1', '<header>nouveau</header>\n' + section + '\n<footer>fin</footer>', 1, {'un': 1}),
+                  data_path)
+
+    sweep_chunks(data_path)
+    TestCase().assertEqual('<header>nouveau</header>\n' + section + '\n<footer>fin</footer>',
+                           restore_page(data_path / '1.json'))
+    stored = [file for _, _, files in os.walk(data_path / 'chunks') for file in files]
+    TestCase().assertEqual(2, len(stored))
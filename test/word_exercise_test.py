@@ -2,7 +2,8 @@ from pathlib import Path
 
 from unittest import TestCase
 
-from word_exercise import Word, load_exercise_file
+import word_exercise
+from word_exercise import Word, load_exercise_file, load_exercise_files
 
 
 def test_load_exercise_file():
@@ -10,3 +11,37 @@ def test_load_exercise_file():
     TestCase().assertEqual(2, len(words))
     TestCase().assertEqual(words[0], Word('vous prenez?*', 'je prends'))
     TestCase().assertEqual(words[1], Word('et lui?', 'il prend'))
+
+
+def test_load_exercise_file_skips_malformed_rows(tmp_path):
+    word_file = tmp_path / 'deck.md'
+    word_file.write_text('# deck\n\n| question | réponse |\n|---|:---|\n| a | 1 // comment |\n| only one cell\n'
+                         '| | 2 |\n|b|2|\n| c |\n| d | 4 | extra |\n| il prend | prend |\n|  |  |\n| vous | prenez |\n',
+                         encoding='utf-8')
+    TestCase().assertEqual([Word('a', '1'), Word('b', '2'), Word('d', '4'), Word('il prend', 'prend'),
+                            Word('vous', 'prenez')], load_exercise_file(word_file))
+
+
+def test_load_exercise_files_reads_folders(tmp_path):
+    (tmp_path / 'decks' / 'more').mkdir(parents=True)
+    (tmp_path / 'decks' / 'b.md').write_text('| b | 2 |\n', encoding='utf-8')
+    (tmp_path / 'decks' / 'more' / 'c.md').write_text('| c | 3 |\n', encoding='utf-8')
+    (tmp_path / 'decks' / 'notes.txt').write_text('| x | y |\n', encoding='utf-8')
+    (tmp_path / 'a.md').write_text('| a | 1 |\n', encoding='utf-8')
+    words = load_exercise_files([tmp_path / 'a.md', tmp_path / 'decks'])
+    TestCase().assertEqual([Word('a', '1'), Word('b', '2'), Word('c', '3')], words)
+
+
+def test_load_exercise_files_uses_cache(tmp_path, mocker):
+    word_file = tmp_path / 'deck.md'
+    word_file.write_text('| a | 1 |\n', encoding='utf-8')
+    cache_path = tmp_path / 'cache.json'
+    TestCase().assertEqual([Word('a', '1')], load_exercise_files([word_file], cache_path))
+
+    spy = mocker.spy(word_exercise, 'load_exercise_file')
+    TestCase().assertEqual([Word('a', '1')], load_exercise_files([word_file], cache_path))
+    TestCase().assertEqual(0, spy.call_count)
+
+    word_file.write_text('| a | 1 |\n| b | 2 |\n', encoding='utf-8')
+    TestCase().assertEqual([Word('a', '1'), Word('b', '2')], load_exercise_files([word_file], cache_path))
+    TestCase().assertEqual(1, spy.call_count)
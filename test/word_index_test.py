@@ -0,0 +1,77 @@
+import os
+from pathlib import Path
+from unittest import TestCase
+
+from word_counter import Article, analyze, write_article
+from word_index import WordIndex, add_postings, write_word_index, query
+
+
+def write_test_index(index_path: Path):
+    articles = [Article('/x/1', '', 1, {'aliment': 2, 'appliquer': 1}),
+                Article('/x/3', '', 3, {'aliment': 1, 'alors': 4}),
+                Article('/x/2', '', 2, {'appliquer': 3, 'alors': 1})]
+    write_word_index(index_path, add_postings(dict(), articles))
+
+
+def test_index_lists_the_episodes_of_a_word(tmpdir):
+    write_test_index(Path(tmpdir))
+
+    with WordIndex(Path(tmpdir)) as index:
+        TestCase().assertEqual({1: 2, 3: 1}, index.episodes('aliment'))
+        TestCase().assertEqual([2, 3], list(index.episodes('alors').keys()))
+        TestCase().assertEqual({}, index.episodes('inconnu'))
+        TestCase().assertEqual(2, index.first_occurrence('alors'))
+        TestCase().assertIsNone(index.first_occurrence('inconnu'))
+        TestCase().assertTrue('appliquer' in index)
+        TestCase().assertFalse('appliq' in index)
+
+
+def test_index_finds_words_by_prefix(tmpdir):
+    write_test_index(Path(tmpdir))
+
+    with WordIndex(Path(tmpdir)) as index:
+        TestCase().assertEqual(['aliment', 'alors'], index.words_with_prefix('al'))
+        TestCase().assertEqual(['aliment', 'alors', 'appliquer'], index.words_with_prefix('a'))
+        TestCase().assertEqual([], index.words_with_prefix('b'))
+
+
+def test_query_lists_the_words_of_every_prefix(tmpdir, capsys):
+    write_test_index(Path(tmpdir) / 'index')
+
+    query(Path(tmpdir), ['app', 'b', 'al'], prefix=True)
+    TestCase().assertEqual(['appliquer: 2 episodes', 'no word starts with b', 'aliment: 2 episodes',
+                            'alors: 2 episodes'], capsys.readouterr().out.splitlines())
+
+
+def test_index_intersects_episodes(tmpdir):
+    write_test_index(Path(tmpdir))
+
+    with WordIndex(Path(tmpdir)) as index:
+        TestCase().assertEqual([3], index.episodes_with_all(['aliment', 'alors']))
+        TestCase().assertEqual([], index.episodes_with_all(['aliment', 'alors', 'appliquer']))
+        TestCase().assertEqual([], index.episodes_with_all(['aliment', 'inconnu']))
+        TestCase().assertEqual([], index.episodes_with_all([]))
+
+
+def test_empty_index(tmpdir):
+    write_word_index(Path(tmpdir), dict())
+
+    with WordIndex(Path(tmpdir)) as index:
+        TestCase().assertEqual({}, index.episodes('aliment'))
+        TestCase().assertEqual([], index.words_with_prefix('a'))
+
+
+def test_analyze_writes_the_same_index_incrementally(tmpdir):
+    data_path = Path(tmpdir)
+    os.makedirs(data_path / 'articles')
+    write_article(Article('/x/2', '', 2, {'deux': 1, 'et': 2}), data_path / 'articles')
+    analyze(data_path)
+    write_article(Article('/x/1', '', 1, {'un': 1, 'et': 1}), data_path / 'articles')
+    analyze(data_path, incremental=True)
+    with WordIndex(data_path / 'index') as index:
+        incremental_postings = index.postings()
+
+    analyze(data_path)
+    with WordIndex(data_path / 'index') as index:
+        TestCase().assertEqual(index.postings(), incremental_postings)
+    TestCase().assertEqual({'deux': {2: 1}, 'et': {1: 1, 2: 2}, 'un': {1: 1}}, incremental_postings)
@@ -0,0 +1,100 @@
+import functools
+import json
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+# Timers and counters for the stages of the pipeline, enabled with 'main.py --timings'. While disabled a timed
+# function costs one extra call and a check of this flag. Timed functions may run in several threads at once, e.g.
+# the downloads of sync --jobs, every thread has its own stack of nested stages.
+enabled = False
+seconds = Counter()
+calls = Counter()
+counters = Counter()
+lock = threading.Lock()
+thread_state = threading.local()
+
+
+def nested_seconds() -> list[float]:
+    if not hasattr(thread_state, 'nested_seconds'):
+        thread_state.nested_seconds = []
+    return thread_state.nested_seconds
+
+
+def enable():
+    global enabled
+    reset()
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def reset():
+    with lock:
+        seconds.clear()
+        calls.clear()
+        counters.clear()
+    nested_seconds().clear()
+
+
+def timed(stage):
+    # a stage only gets the time that is not spent in the timed functions it calls
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            stack = nested_seconds()
+            stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                own_seconds = elapsed - stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                with lock:
+                    seconds[stage] += own_seconds
+                    calls[stage] += 1
+        return wrapper
+    return decorator
+
+
+def count(counter, amount=1):
+    if enabled:
+        with lock:
+            counters[counter] += amount
+
+
+def summary():
+    stages = {stage: {'seconds': seconds[stage], 'calls': calls[stage]} for stage in seconds.keys()}
+    rates = dict()
+    if counters['page characters'] and seconds['sections']:
+        rates['characters per second (sections)'] = counters['page characters'] / seconds['sections']
+    if counters['pages']:
+        rates['paragraphs per page'] = counters['paragraphs'] / counters['pages']
+    if counters['words'] and seconds['tokenise']:
+        rates['words per second (tokenise)'] = counters['words'] / seconds['tokenise']
+    return {'stages': stages, 'counters': dict(counters), 'rates': rates}
+
+
+def print_summary():
+    result = summary()
+    print(f'{"stage":>20} {"calls":>8} {"seconds":>10}')
+    for stage, timing in sorted(result['stages'].items(), key=lambda item: -item[1]['seconds']):
+        print(f'{stage:>20} {timing["calls"]:>8} {timing["seconds"]:>10.4f}')
+    for counter, value in result['counters'].items():
+        print(f'{counter:>20}: {value}')
+    for rate, value in result['rates'].items():
+        print(f'{rate}: {value:.1f}')
+
+
+def write_summary(output_file: Path):
+    with open(output_file, 'w', encoding='utf-8') as file:
+        file.write(json.dumps(summary(), indent=2))
+    print(f'output in {output_file}')
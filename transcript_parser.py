@@ -0,0 +1,133 @@
+from collections import deque
+from html.parser import HTMLParser
+from typing import Iterable, Iterator
+
+from word_counter import extract_text_from_p_section, group_words_in_list, report_missing_transcription, \
+    login_cookies, request_headers, load_userdata
+
+transcription_marker = 'Transcription de'
+
+
+class TranscriptParser(HTMLParser):
+    # Finds the paragraphs of the first section that mentions 'Transcription de' while the page is fed in chunks.
+    # Sections and paragraphs are delimited the same way extract_sections and extract_p_sections do: a section
+    # runs from '<section' to the next '</section>', a nested '<section' does not start a new one.
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.paragraphs = deque()
+        self.in_section = False
+        self.section_done = False
+        self.is_transcription = False
+        self.section_tail = ''
+        self.pending_paragraphs = []
+        self.paragraph = None
+
+    def check_marker(self, text):
+        if self.is_transcription:
+            return
+        text = self.section_tail + text
+        if text.find(transcription_marker) >= 0:
+            self.is_transcription = True
+            # paragraphs seen before the marker belong to the transcription section too
+            self.paragraphs.extend(self.pending_paragraphs)
+            self.pending_paragraphs = []
+        self.section_tail = text[-len(transcription_marker) + 1:]
+
+    def append(self, raw_text):
+        if self.paragraph is not None:
+            self.paragraph.append(raw_text)
+
+    def handle_starttag(self, tag, attrs):
+        if self.section_done:
+            return
+        raw_text = self.get_starttag_text()
+        if tag == 'section' and not self.in_section:
+            self.in_section = True
+            self.section_tail = ''
+        if not self.in_section:
+            return
+        self.check_marker(raw_text)
+        if tag == 'p' and self.paragraph is None:
+            self.paragraph = []
+        self.append(raw_text)
+
+    def handle_startendtag(self, tag, attrs):
+        if self.in_section and not self.section_done:
+            raw_text = self.get_starttag_text()
+            self.check_marker(raw_text)
+            self.append(raw_text)
+
+    def handle_endtag(self, tag):
+        if not self.in_section or self.section_done:
+            return
+        self.append(f'</{tag}>')
+        if tag == 'p' and self.paragraph is not None:
+            paragraph = ''.join(self.paragraph)
+            self.paragraph = None
+            if self.is_transcription:
+                self.paragraphs.append(paragraph)
+            else:
+                self.pending_paragraphs.append(paragraph)
+        elif tag == 'section':
+            self.in_section = False
+            self.paragraph = None
+            self.pending_paragraphs = []
+            self.section_done = self.is_transcription
+
+    def handle_data(self, data):
+        if self.in_section and not self.section_done:
+            self.check_marker(data)
+            self.append(data)
+
+    def handle_entityref(self, name):
+        self.handle_data(f'&{name};')
+
+    def handle_charref(self, name):
+        self.handle_data(f'&#{name};')
+
+
+def iter_transcript_paragraphs(chunks: Iterable[str]) -> Iterator[str]:
+    parser = TranscriptParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+        while parser.paragraphs:
+            yield parser.paragraphs.popleft()
+        if parser.section_done:
+            break
+    else:
+        parser.close()
+        while parser.paragraphs:
+            yield parser.paragraphs.popleft()
+
+    if not parser.is_transcription:
+        report_missing_transcription()
+
+
+def iter_chunks(text, chunk_size=16384):
+    for start in range(0, len(text), chunk_size):
+        yield text[start:start + chunk_size]
+
+
+def count_words_in_chunks(chunks: Iterable[str]) -> dict[str, int]:
+    paragraphs = iter_transcript_paragraphs(chunks)
+    return group_words_in_list(extract_text_from_p_section(paragraph) for paragraph in paragraphs)
+
+
+def iter_url_chunks(url, userdata, chunk_size=16384):
+    import requests
+
+    with requests.get(url, cookies=login_cookies(userdata), headers=request_headers, stream=True) as response:
+        if response.encoding is None:
+            response.encoding = 'utf-8'
+        yield from response.iter_content(chunk_size=chunk_size, decode_unicode=True)
+
+
+def transcript_page_from_chunks(chunks: Iterable[str]) -> str:
+    # keeps only the transcription of the page, in a form process_file_data still understands
+    paragraphs = iter_transcript_paragraphs(chunks)
+    return f'<section>\n<h2>{transcription_marker} l\'épisode</h2>\n' + '\n'.join(paragraphs) + '\n</section>\n'
+
+
+def load_transcript_from_url(url, data_path):
+    print(f'loading {url}')
+    return transcript_page_from_chunks(iter_url_chunks(url, load_userdata()))
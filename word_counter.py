@@ -1,18 +1,35 @@
+import hashlib
 import html
 import json
+import mmap
 import os.path
 import re
+import unicodedata
+from collections import Counter
+from contextlib import nullcontext
 from dataclasses import dataclass
+from itertools import accumulate
 from os import listdir
 from os.path import isfile, join
 from pathlib import Path
 from typing import List
-import bisect
-import matplotlib.pyplot as plt
-import requests
 
-whitespace = re.compile(r"\s+")
-multiline_anchor_tag = re.compile(r"<a.*?>", re.MULTILINE)
+from http_cache import HttpCache, get_with_cache
+from page_store import ChunkStore, compress_text, decompress_text
+import timings
+from timings import timed, count
+from word_index import WordIndex, add_postings, write_word_index
+
+# neither tags nor bracketed text like [00:00:10] span multiple lines
+tags = re.compile(r"</(?:li|i|p|span|strong|b|em|a)>|<(?:i|p|b|em|br|br/|br /)>|<(?:strong|span|a).*?>")
+brackets = re.compile(r"\[.*?]")
+# a word is a run of characters up to the next space. Elisions (l’homme) and hyphenated compounds (bien-être) are
+# one word. Runs starting with a digit, like 1500€ or 100%, and lone punctuation are not words.
+junk_word = re.compile(r"[0-9]|(?:\*\*\*|[;\-,/+=&])$")
+section_start = re.compile("<section")
+p_start = re.compile("<p")
+# translating the utf-8 bytes is a lot faster than str.translate on text with accents
+ascii_punctuation = bytes.maketrans(b'\n.,:()?!$%', b' ' * 10)
 
 # TODO
 # - clean up this messy code
@@ -35,7 +52,8 @@ class Article:
 
     @classmethod
     def from_json(cls, json_data):
-        return cls(json_data["file_name"], json_data["text"], json_data["sequence_number"], json_data["word_count"])
+        return cls(json_data["file_name"], article_text(json_data), json_data["sequence_number"],
+                   json_data["word_count"])
 
     def __init__(self, file_name, text, sequence_number=None, word_count=None):
         self.file_name = file_name
@@ -61,6 +79,54 @@ class Article:
             return sequence_number
 
 
+class LazyArticle:
+    # An article read from a file written by write_article, without keeping the page text in memory. The text is
+    # read from the file again when it is used.
+    __slots__ = ('path', 'file_name', 'sequence_number', 'word_count', 'text_start', 'text_end', 'compressed')
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, 'rb') as file, map_file(file) as data:
+            count('bytes mapped', len(data))
+            # write_article writes the keys in this order, files of older versions have the page in "text" instead
+            # of "page" and "section". Quotes in the values are escaped, so the keys can't be found inside them.
+            self.compressed = data.find(b', "section": ') >= 0
+            name_end = data.find(b', "page": ') if self.compressed else data.find(b', "text": ')
+            text_key = data.find(b', "section": ') if self.compressed else name_end
+            text_key_length = len(b', "section": ') if self.compressed else len(b', "text": ')
+            # searched after the text, a word 'sequence_number' in the word counts has the same key
+            counts_key = data.find(b', "sequence_number": ', text_key)
+            if data[:len(b'{"file_name": ')] != b'{"file_name": ' or name_end < 0 or counts_key < text_key:
+                article = Article.from_json(json.loads(data[:]))
+                self.file_name, self.sequence_number, self.word_count = \
+                    article.file_name, article.sequence_number, article.word_count
+                self.text_start, self.text_end = None, None
+                return
+            self.file_name = json.loads(data[len(b'{"file_name": '):name_end])
+            self.text_start, self.text_end = text_key + text_key_length, counts_key
+            counts = json.loads(b'{' + data[counts_key + 2:])
+            self.sequence_number = counts['sequence_number']
+            self.word_count = counts['word_count']
+
+    @property
+    def text(self):
+        with open(self.path, 'rb') as file, map_file(file) as data:
+            if self.text_start is None:
+                return article_text(json.loads(data[:]))
+            text = json.loads(data[self.text_start:self.text_end])
+            return decompress_text(text) if self.compressed else text
+
+    def __lt__(self, other):
+        return self.sequence_number < other.sequence_number
+
+
+def map_file(file):
+    # mmap can't map an empty file, it is read as an empty file would be and gives the same json error
+    if os.fstat(file.fileno()).st_size == 0:
+        return nullcontext(b'')
+    return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
 def read_data_from_file(path):
     with open(path, 'r', encoding="utf-8") as file:
         return file.read()
@@ -71,29 +137,56 @@ def load_userdata():
         return file.read().rstrip()
 
 
+def login_cookies(userdata):
+    return {'wordpress_logged_in_432eefc90b98f2ff74b213258c58921e': userdata}
+
+
+request_headers = {'User-Agent': 'Mozilla/5.0'}
+
+
+def word_index_path(data_path: Path) -> Path:
+    return data_path / 'index'
+
+
+def http_cache_path(data_path: Path) -> Path:
+    return data_path.parent / 'http_cache'
+
+
+@timed('download')
 def load_text_from_url(url, data_path):
     print(f'loading {url}')
     userdata = load_userdata()
-    cookies = {'wordpress_logged_in_432eefc90b98f2ff74b213258c58921e': userdata}
-    headers = {'User-Agent': 'Mozilla/5.0'}
-    response = requests.get(url, cookies=cookies, headers=headers)
-    webpage = response.text
+    cache = HttpCache(http_cache_path(data_path))
+    webpage, _ = get_with_cache(url, cache, login_cookies(userdata), request_headers)
 
     return webpage
 
 
+@timed('download')
+def load_changed_text_from_url(url, data_path):
+    print(f'refreshing {url}')
+    userdata = load_userdata()
+    cache = HttpCache(http_cache_path(data_path))
+    webpage, changed = get_with_cache(url, cache, login_cookies(userdata), request_headers)
+    # an unchanged page is still written when its article was removed
+    if not changed and os.path.exists(construct_article_data_file_name(get_sequence_number_from_url_or_file(url),
+                                                                       data_path)):
+        print(f'{url} did not change')
+        return None
+
+    return webpage
+
+
+@timed('json io')
 def load_text_from_file(json_file, data_path):
+    # the whole page, so writing the article again keeps the parts of the page outside the transcription
     print(f'loading {json_file} from {data_path}')
-    with open(data_path / json_file, "r", encoding="utf-8") as f:
-        data: Article = Article(**json.loads(f.read()))
-
-    return data.text
+    count('bytes read', os.path.getsize(data_path / json_file))
+    return restore_page(data_path / json_file)
 
 
 def remove_junk_words(word):
-    if re.match('^[0-9]+.*', word) or re.match('^[0-9]+$', word) or re.match('^\*\*\*$', word):
-        return ''
-    elif word in [';', '-', ',', '/', '+', '=', '&']:
+    if junk_word.match(word):
         return ''
     return word.strip()
 
@@ -102,71 +195,85 @@ def unescape(data):
     return html.unescape(data)
 
 
+def tokenize(text):
+    return (word for word in text.lower().split() if not junk_word.match(word))
+
+
+def normalise_word(word):
+    # a word typed by the user, written the way the words of the articles are counted
+    return unicodedata.normalize('NFC', word.lower().replace("'", '’'))
+
+
 def split_words(text):
-    words = [remove_junk_words(word) for word in text.lower().split(' ')]
-    return list(filter(lambda w: len(w.strip()) > 0, words))
+    return list(tokenize(text))
 
 
 def group_words(data):
-    words = dict()
-    for word in data:
-        if word in words:
-            words[word] = words[word] + 1
-        else:
-            words[word] = 1
-
-    return words
+    return Counter(data)
 
 
+@timed('tokenise')
 def group_words_in_list(data):
-    words_per_line = [group_words(split_words(line)) for line in data]
-    words = dict()
-    for line in words_per_line:
-        for word in line:
-            if word in words:
-                words[word] = words[word] + line[word]
-            else:
-                words[word] = line[word]
+    # counting every token first means only the distinct words have to be checked for junk
+    words = Counter()
+    for line in data:
+        words.update(line.lower().split())
+    for word in [word for word in words if junk_word.match(word)]:
+        del words[word]
 
     return words
 
 
+def iter_sections(data):
+    for match in section_start.finditer(data):
+        start = match.start()
+        yield data[start:data.find('</section>', start) + 10]
+
+
+@timed('sections')
 def extract_sections(data):
-    section_start_positions = [_.start() for _ in re.finditer("<section", data)]
-    return [data[start:data.find('</section>', start) + 10] for start in section_start_positions]
+    return list(iter_sections(data))
 
 
+@timed('sections')
 def extract_transcription_section(sections):
     transcription_section = next((section for section in sections if section.find("Transcription de") >= 0),
                                  "TRANSCRIPTION NOT FOUND")
     if transcription_section == "TRANSCRIPTION NOT FOUND":
-        print(
-            'ERROR: this file does not contain a transcription section, check the credentials in secrets/userdata.txt')
-        exit(-1)
+        report_missing_transcription()
     return transcription_section
 
 
+def report_missing_transcription():
+    print('ERROR: this file does not contain a transcription section, check the credentials in secrets/userdata.txt')
+    exit(-1)
+
+
+def iter_p_sections(section):
+    for match in p_start.finditer(section):
+        start = match.start()
+        count('paragraphs')
+        yield section[start:section.find('</p>', start) + 4]
+
+
+@timed('sections')
 def extract_p_sections(section):
-    p_section_start_positions = [_.start() for _ in re.finditer("<p", section)]
-    return [section[start:section.find('</p>', start) + 4] for start in p_section_start_positions]
+    return list(iter_p_sections(section))
 
 
+@timed('normalise')
 def extract_text_from_p_section(data):
-    result = unescape(data)
-    result = result.replace('</li>', ' ').replace('</i>', ' ').replace('<i>', ' ').replace('<br/>', ' ').replace(
-        '<br />', ' ').replace('<br>', ' ').replace('<p>', ' ').replace('</p>', ' ').replace('</span>', ' ').replace(
-        '</strong>', ' ').replace('“', '').replace('</b>', ' ').replace('<b>', ' ').replace('<em>', ' ').replace(
-        '</em>', ' ').replace('<em>', ' ').replace('«', '').replace('»', '').replace('–', ' ').replace('…', ' ')
+    return normalise_text(brackets.sub('', tags.sub(' ', unescape(data))))
 
-    result = re.sub('<strong.*?>', ' ', result)
-    result = re.sub('<span.*?>', ' ', result)
-    result = multiline_anchor_tag.sub(' ', result, re.MULTILINE)
-    result = re.sub('\\[.*?]', '', result)
-    result = result.replace('\n', ' ').replace('.', ' ').replace(',', ' ').replace(':', ' ').replace('\'', '').replace(
-        '(', ' ').replace(')', ' ').replace('?', ' ').replace('!', ' ').replace('!', ' ').replace('$', ' ').replace(
-        '%', ' ').replace('</a>', ' ')
 
-    return whitespace.sub(' ', result).strip()
+def normalise_text(text):
+    # the punctuation of text that is already unescaped and has no markup, the text is NFC normalised so an é is
+    # the same word whether it is written as one or as two code points
+    result = unicodedata.normalize('NFC', text).encode().translate(ascii_punctuation).decode()
+    result = result.replace('“', '').replace('«', '').replace('»', '').replace('–', ' ').replace('…', ' ').replace(
+        "'", '’')
+
+    return ' '.join(result.split())
 
 
 def extract_text_from_all_p_sections(p_sections):
@@ -174,21 +281,81 @@ def extract_text_from_all_p_sections(p_sections):
 
 
 def process_file_data(text_from_file):
-    sections = extract_sections(text_from_file)
-    transcription_section = extract_transcription_section(sections)
-    p_sections = extract_p_sections(transcription_section)
-    all_text = extract_text_from_all_p_sections(p_sections)
+    # every step is a generator, only one section, paragraph and line exist at a time next to the word counts
+    transcription_section = extract_transcription_section(iter_sections(text_from_file))
+    paragraphs = iter_p_sections(transcription_section)
+    word_count = group_words_in_list(extract_text_from_p_section(paragraph) for paragraph in paragraphs)
+
+    count('pages')
+    count('page characters', len(text_from_file))
+    if timings.enabled:
+        count('words', sum(word_count.values()))
+    return word_count
+
 
-    return group_words_in_list(all_text)
+def split_page(text) -> tuple[str, str, str]:
+    # the page before the transcription section, the section and the page after it, the section is the one
+    # extract_transcription_section finds. Without a transcription the whole text is kept as the section.
+    for match in section_start.finditer(text):
+        start = match.start()
+        section = text[start:text.find('</section>', start) + len('</section>')]
+        if section.find("Transcription de") >= 0:
+            return text[:start], section, text[start + len(section):]
+    return '', text, ''
 
 
+def article_text(json_data) -> str:
+    # the text of an article file: the transcription section, or the whole page for files of older versions
+    if 'section' in json_data:
+        return decompress_text(json_data['section'])
+    return json_data['text']
+
+
+@timed('json io')
 def write_article(article: Article, data_path: Path):
+    # Only the transcription section is stored with the article, compressed, it is all that the word counts are
+    # made from. The rest of the page goes to the chunk store in the chunks folder next to the articles, where
+    # the parts that every page has are only stored once, restore_page puts the page together again.
     filename = construct_article_data_file_name(article.sequence_number, data_path)
-    with open(Path(__file__).parent / filename, 'w') as file:
-        file.write(json.dumps(article.__dict__))
+    before, section, after = split_page(article.text)
+    chunks = ChunkStore(Path(__file__).parent / data_path / 'chunks')
+    # written under another name first, so serve and analyze never read half an article
+    temporary_file = Path(__file__).parent / filename.with_name(f'{filename.name}.{os.getpid()}.tmp')
+    with open(temporary_file, 'w') as file:
+        file.write(json.dumps({'file_name': article.file_name,
+                               'page': {'before': chunks.put_text(before), 'after': chunks.put_text(after)},
+                               'section': compress_text(section), 'sequence_number': article.sequence_number,
+                               'word_count': article.word_count}))
+    os.replace(temporary_file, Path(__file__).parent / filename)
     print(f'write {filename} with {len(article.word_count.keys())} words')
 
 
+def restore_page(path: Path) -> str:
+    # the page as it was downloaded
+    with open(path, 'r', encoding='utf-8') as file:
+        json_data = json.load(file)
+    if 'section' not in json_data:
+        return json_data['text']
+    chunks = ChunkStore(path.parent / 'chunks')
+    return chunks.get_text(json_data['page']['before']) + decompress_text(json_data['section']) + \
+        chunks.get_text(json_data['page']['after'])
+
+
+def sweep_chunks(articles_path: Path):
+    # a page that is stored again may not use all chunks of the page it replaces, the chunks that no article uses
+    # anymore are removed
+    used_keys = set()
+    for f in listdir(articles_path):
+        if isfile(join(articles_path, f)) and f.endswith('.json'):
+            with open(articles_path / f, 'r', encoding='utf-8') as file:
+                page = json.load(file).get('page')
+            if page is not None:
+                used_keys.update(page['before'])
+                used_keys.update(page['after'])
+    removed = ChunkStore(articles_path / 'chunks').sweep(used_keys)
+    print(f'removed {removed} chunks that no article uses')
+
+
 def construct_article_data_file_name(sequence_number, data_path: Path) -> Path:
     file_name = str(sequence_number) + '.json'
     return data_path / file_name
@@ -214,34 +381,27 @@ def get_new_article(data_loader_func, url, data_path: Path, reload=False):
     article_path = data_path / 'articles'
     article_file_name = construct_article_data_file_name(get_sequence_number_from_url_or_file(url), article_path)
     if not os.path.exists(article_file_name) or reload:
-        return Article(url, data_loader_func(url, article_path))
+        text = data_loader_func(url, article_path)
+        return Article(url, text) if text is not None else None
     else:
         print(f'skipping {article_file_name}')
         return None
 
 
 def sum_counts(articles):
-    counts = dict()
+    counts = Counter()
     for article in articles:
-        for word in article.word_count.keys():
-            if word in counts:
-                counts[word] = counts[word] + article.word_count[word]
-            else:
-                counts[word] = 1
+        counts.update(article.word_count)
 
     return counts
 
 
-def sync_podcasts(urls_data_file, data_root: Path, data_loader_func=load_text_from_url) -> int:
-    data_path = Path(__file__).parent / data_root
-    urls = load_file_list(urls_data_file, data_path)
-    urls = [url.strip() for url in urls]
-    data = [get_new_article(data_loader_func, url, data_path) for url in urls]
-    data = [article for article in data if article is not None]
-    for article in data:
-        write_article(article, data_path / 'articles')
+def sync_podcasts(urls_data_file, data_root: Path, data_loader_func=load_text_from_url, refresh=False) -> int:
+    # the Inner French episodes are one of the sources, sources imports this module
+    from sources import InnerFrenchSource, sync_source
 
-    return len(data)
+    data_path = Path(__file__).parent / data_root
+    return sync_source(InnerFrenchSource(urls_data_file, data_path, data_loader_func), data_root, refresh)
 
 
 def is_word_in_list(word, words: dict):
@@ -287,88 +447,316 @@ class WordCountJSONEncoder(json.JSONEncoder):
         return super().default(obj)
 
 
+class WordFrequencies:
+    # total: how often a word occurs in all episodes, documents: the number of episodes it occurs in,
+    # episodes: per episode the number of words and distinct words, postings: per word how often it occurs in every
+    # episode, the postings the word index is written from. word_frequencies.json has all but the postings.
+    def __init__(self, total=None, documents=None, episodes=None, postings=None):
+        self.total = Counter(total)
+        self.documents = Counter(documents)
+        self.episodes: dict[int, dict[str, int]] = dict(episodes or {})
+        self.postings: dict[str, dict[int, int]] = postings if postings is not None else dict()
+
+    def add(self, sequence_number, word_count: dict[str, int]):
+        self.total.update(word_count)
+        self.documents.update(word_count.keys())
+        self.add_episode(sequence_number, sum(word_count.values()), len(word_count))
+        for word, word_count_in_episode in word_count.items():
+            self.postings.setdefault(word, dict())[sequence_number] = word_count_in_episode
+
+    def add_episode(self, sequence_number, words, distinct_words):
+        episode = self.episodes.setdefault(sequence_number, {'words': 0, 'distinct': 0})
+        episode['words'] += words
+        episode['distinct'] += distinct_words
+
+    def episode_count(self, word, sequence_number):
+        return self.postings.get(word, {}).get(sequence_number, 0)
+
+    def episode_frequency(self, word, sequence_number):
+        # the share of the words of the episode that are this word
+        return self.episode_count(word, sequence_number) / max(self.episodes[sequence_number]['words'], 1)
+
+    def to_dict(self):
+        words = sorted(self.total.keys(), key=lambda word: (-self.total[word], word))
+        return {
+            'episodes': {str(episode): counts for episode, counts in sorted(self.episodes.items())},
+            'words': [{'word': word, 'total': self.total[word], 'documents': self.documents[word]} for word in words]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls({item['word']: item['total'] for item in data['words']},
+                   {item['word']: item['documents'] for item in data['words']},
+                   {int(episode): counts for episode, counts in data['episodes'].items()})
+
+
+@timed('frequencies')
+def word_frequencies(articles) -> WordFrequencies:
+    # the postings are made first, the totals are then a sum per word instead of an update per word of every article
+    frequencies = WordFrequencies(postings=add_postings(dict(), articles))
+    for article in articles:
+        frequencies.add_episode(article.sequence_number, sum(article.word_count.values()), len(article.word_count))
+    frequencies.total = Counter({word: sum(counts.values()) for word, counts in frequencies.postings.items()})
+    frequencies.documents = Counter({word: len(counts) for word, counts in frequencies.postings.items()})
+    return frequencies
+
+
+@timed('json io')
+def load_word_frequencies(data_path: Path) -> WordFrequencies:
+    with open(data_path / 'word_frequencies.json', 'r') as file:
+        return WordFrequencies.from_dict(json.load(file))
+
+
+@timed('json io')
+def write_word_frequencies(data_path: Path, frequencies: WordFrequencies):
+    word_frequencies_file = data_path / 'word_frequencies.json'
+    with open(word_frequencies_file, 'w') as file:
+        file.write(json.dumps(frequencies.to_dict()))
+        print(f'output in {str(word_frequencies_file)}')
+
+
 def word_count_to_json(word_count: List[WordCount]):
     return json.dumps([word.__dict__ for word in word_count])
 
 
-def analyze_articles(articles: List[Article]) -> list[WordCount]:
-    first_occurrences = dict()
+@timed('first occurrences')
+def first_occurrence_per_word(articles: List[Article]) -> dict[str, int]:
+    first_occurrence = dict()
+    for article in sorted(articles):
+        for word in article.word_count.keys():
+            if word not in first_occurrence:
+                first_occurrence[word] = article.sequence_number
+
+    return first_occurrence
+
 
-    words = set()
-    [words.update(list(article.word_count.keys())) for article in articles]
+@timed('first occurrences')
+def update_first_occurrences(first_occurrence: dict[str, int], article: Article):
+    # articles may arrive in any order, e.g. when an older episode is synced later
+    for word in article.word_count.keys():
+        if word not in first_occurrence or article.sequence_number < first_occurrence[word]:
+            first_occurrence[word] = article.sequence_number
 
-    for word in words:
-        first_occurrence = word_occurs_first_in(word, articles)
-        word_list = first_occurrences.get(first_occurrence, [])
-        bisect.insort(word_list, word)
-        first_occurrences[first_occurrence] = word_list
+
+@timed('first occurrences')
+def group_by_first_occurrence(first_occurrence: dict[str, int]) -> list[WordCount]:
+    words_per_episode = dict()
+    for word, episode in first_occurrence.items():
+        words_per_episode.setdefault(episode, []).append(word)
 
     result = []
-    [result.append(WordCount(file, len(first_occurrences[file]), (first_occurrences[file]))) for file in
-     first_occurrences.keys()]
+    for episode in sorted(words_per_episode.keys()):
+        words = sorted(words_per_episode[episode])
+        result.append(WordCount(episode, len(words), words))
     return result
 
 
-def analyze(data_path: Path):
+def analyze_articles(articles: List[Article]) -> list[WordCount]:
+    return group_by_first_occurrence(first_occurrence_per_word(articles))
+
+
+@timed('json io')
+def load_article(path: Path) -> Article:
+    with open(path, 'r') as file:
+        return Article.from_json(json.load(file))
+
+
+@timed('json io')
+def load_lazy_article(path: Path) -> LazyArticle:
+    return LazyArticle(path)
+
+
+def list_article_files(articles_path: Path) -> dict[str, dict[str, int]]:
+    files = dict()
+    for f in listdir(articles_path):
+        if isfile(join(articles_path, f)) and f.endswith('.json'):
+            stat = os.stat(articles_path / f)
+            files[f] = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+    return files
+
+
+def load_analyze_state(state_file: Path):
+    if not os.path.exists(state_file):
+        return None
+    with open(state_file, 'r', encoding="utf-8") as file:
+        return json.load(file)
+
+
+def load_analyzed_article(path: Path, lemmatizer=None):
+    # with a lemmatizer the word counts of the article are counts of lemmas
+    article = load_lazy_article(path)
+    if lemmatizer is not None:
+        article.word_count = lemmatizer.word_count(article.word_count)
+    return article
+
+
+# patch the stored first occurrences, frequencies and word index with articles added since the last run, returns None when
+# an article changed or was removed because then a word may have lost its first occurrence
+def analyze_incrementally(articles_path: Path, files: dict[str, dict[str, int]], state, lemmatizer=None):
+    data_path = articles_path.parent
+    if not os.path.exists(data_path / 'word_frequencies.json') or \
+            not os.path.exists(word_index_path(data_path) / 'words.txt'):
+        return None
+    if state.get('lemmatizer') != (lemmatizer.name if lemmatizer is not None else None):
+        print('the last run used other lemmas, analyzing all articles')
+        return None
+    known_files = state['files']
+    for file_name, file_info in known_files.items():
+        current = files.get(file_name)
+        if current is None or current['mtime_ns'] != file_info['mtime_ns'] or current['size'] != file_info['size']:
+            print(f'{file_name} changed or was removed, analyzing all articles')
+            return None
+
+    first_occurrence = state['first_occurrence']
+    frequencies = load_word_frequencies(data_path)
+    with WordIndex(word_index_path(data_path)) as index:
+        frequencies.postings = index.postings()
+    new_files = [f for f in files.keys() if f not in known_files]
+    print(f'analyzing {len(new_files)} new of {len(files)} articles')
+    for data_file in new_files:
+        add_analyzed_article(first_occurrence, frequencies, load_analyzed_article(articles_path / data_file, lemmatizer))
+
+    return first_occurrence, frequencies
+
+
+def add_analyzed_article(first_occurrence: dict[str, int], frequencies: WordFrequencies, article):
+    update_first_occurrences(first_occurrence, article)
+    frequencies.add(article.sequence_number, article.word_count)
+
+
+def analyze(data_path: Path, incremental=False, lemmatizer=None):
     articles_path = data_path / 'articles'
-    data_files = [f for f in listdir(articles_path) if isfile(join(articles_path, f)) and f.endswith('.json')]
+    files = list_article_files(articles_path)
+    state_file = data_path / 'first_occurrences_state.json'
 
-    articles = list[Article]()
-    for data_file in data_files:
-        with open(articles_path / data_file, 'r') as file:
-            article: Article = Article(**json.load(file))
-            articles.append(article)
+    result = None
+    state = load_analyze_state(state_file) if incremental else None
+    if state is not None:
+        result = analyze_incrementally(articles_path, files, state, lemmatizer)
 
-    first_occurrences = analyze_articles(articles)
+    if result is None:
+        articles = [load_analyzed_article(articles_path / data_file, lemmatizer) for data_file in files.keys()]
+        result = first_occurrence_per_word(articles), word_frequencies(articles)
 
+    first_occurrence, frequencies = result
+    first_occurrences = group_by_first_occurrence(first_occurrence)
+
+    write_first_occurrences(data_path, first_occurrences)
+    write_word_frequencies(data_path, frequencies)
+    write_word_index(word_index_path(data_path), frequencies.postings)
+
+    # written last, the next incremental run reads the frequencies and the index that go with it
+    with open(state_file, 'w', encoding="utf-8") as file:
+        file.write(json.dumps({'files': files, 'first_occurrence': first_occurrence,
+                               'lemmatizer': lemmatizer.name if lemmatizer is not None else None}))
+    return first_occurrences
+
+
+@timed('json io')
+def write_first_occurrences(data_path: Path, first_occurrences: list[WordCount]):
     first_occurances_file = data_path / 'first_occurrences.json'
     with open(first_occurances_file, 'w') as file:
         file.write(json.dumps(first_occurrences, cls=WordCountJSONEncoder))
         print(f'output in {str(first_occurances_file)}')
+    with open(data_path / 'episode_counts.json', 'w') as file:
+        file.write(json.dumps([{'episode': word_count.episode, 'count': word_count.count}
+                               for word_count in first_occurrences]))
+
 
+def count_words_in_article_file(path: Path) -> dict[str, int]:
+    with open(path, 'r', encoding="utf-8") as file:
+        return process_file_data(article_text(json.load(file)))
 
-def re_load(data_path: Path):
+
+def re_load(data_path: Path, jobs=1):
     article_folder = Path(__file__).parent / data_path / 'articles'
     data_files = [f for f in listdir(article_folder) if isfile(join(article_folder, f)) and f.endswith('.json')]
 
     data_loader_func = load_text_from_file
-    articles = [get_new_article(data_loader_func, file, data_path, True) for file in data_files]
-    articles = [article for article in articles if article is not None]
+    if jobs > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        # the workers only send back the word counts, the page text is read again here to write the article
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            word_counts = executor.map(count_words_in_article_file, [article_folder / f for f in data_files])
+            articles = [Article(file, data_loader_func(file, article_folder), None, word_count)
+                        for file, word_count in zip(data_files, word_counts)]
+    else:
+        articles = [get_new_article(data_loader_func, file, data_path, True) for file in data_files]
+        articles = [article for article in articles if article is not None]
 
     for article in articles:
         write_article(article, article_folder)
+    sweep_chunks(article_folder)
 
     return articles
 
 
-def plot_word_counts(data_path: Path, output_file):
-    with open(data_path / 'first_occurrences.json', "r", encoding="utf-8") as f:
-        word_counts = [WordCount.from_dict(item) for item in json.load(f)]
-    word_counts.sort()
-    episodes = [wc.episode for wc in word_counts]
-    word_lengths = [len(wc.words) for wc in word_counts]
-    total_number_of_words = sum(word_count.count for word_count in word_counts)
+def load_episode_counts(data_path: Path) -> list[tuple[int, int]]:
+    # the number of new words per episode, first_occurrences.json is only read for data of an older analyze
+    if os.path.exists(data_path / 'episode_counts.json'):
+        with open(data_path / 'episode_counts.json', 'r', encoding="utf-8") as file:
+            return [(item['episode'], item['count']) for item in json.load(file)]
+    with open(data_path / 'first_occurrences.json', "r", encoding="utf-8") as file:
+        return sorted((item['episode'], item['count']) for item in json.load(file))
 
-    fig, ax = plt.subplots(figsize=(10, 6))
-    bars = ax.bar(episodes, word_lengths, color='skyblue')
 
-    for bar, word_length in zip(bars, word_lengths):
-        height = bar.get_height()
-        ax.text(bar.get_x() + bar.get_width() / 2, height / 2, str(word_length), ha='center', va='center', fontsize=8,
-                rotation=90)
+def rolling_average(values: List[int], window: int) -> List[float]:
+    result = []
+    total = 0
+    for i, value in enumerate(values):
+        total += value
+        if i >= window:
+            total -= values[i - window]
+        result.append(total / min(i + 1, window))
+    return result
+
 
-    ax.set_xlabel('Episode')
+def plot_word_counts(data_path: Path, output_file, window=10, use_cache=True):
+    episode_counts = load_episode_counts(data_path)
+    episodes = [episode for episode, _ in episode_counts]
+    word_lengths = [word_count for _, word_count in episode_counts]
+    total_number_of_words = sum(word_lengths)
+
+    # the same counts and window give the same picture, plot_cache.json has the hash of the data of every output file
+    plot_hash = hashlib.sha1(json.dumps([episode_counts, window]).encode('utf-8')).hexdigest()
+    cache_file = data_path / 'plot_cache.json'
+    cache = dict()
+    if os.path.exists(cache_file):
+        with open(cache_file, 'r', encoding="utf-8") as file:
+            cache = json.load(file)
+    if use_cache and cache.get(str(output_file)) == plot_hash and os.path.exists(output_file):
+        print(f'{output_file} is up to date')
+        return
+
+    # importing matplotlib takes longer than most commands, so only plot loads it
+    import matplotlib.pyplot as plt
+
+    fig, (ax, total_ax) = plt.subplots(2, 1, figsize=(10, 9), sharex=True, gridspec_kw={'height_ratios': [2, 1]})
+    bars = ax.bar(episodes, word_lengths, color='skyblue')
+    ax.bar_label(bars, label_type='center', rotation=90, fontsize=8)
+    ax.plot(episodes, rolling_average(word_lengths, window), color='navy', label=f'Average of {window} episodes')
+    ax.legend(loc='upper right')
     ax.set_ylabel('Number of Words')
     ax.set_title('Number of new Words per Episode, Total: ' + str(total_number_of_words))
 
+    total_ax.plot(episodes, list(accumulate(word_lengths)), color='seagreen')
+    total_ax.set_xlabel('Episode')
+    total_ax.set_ylabel('Total number of Words')
+
     plt.xticks(rotation=45)
-    ax.set_xlim(left=0.5)
+    total_ax.set_xlim(left=0.5)
     tick_positions = list(range(5, max(episodes) + 1, 5))
     tick_positions.insert(0, 1)
-    ax.set_xticks(tick_positions)
-    ax.set_xticklabels([str(i) for i in tick_positions])
+    total_ax.set_xticks(tick_positions)
+    total_ax.set_xticklabels([str(i) for i in tick_positions])
 
-    plt.tight_layout()
+    # fixed margins, tight_layout would measure every label before the figure is drawn
+    fig.subplots_adjust(left=0.09, right=0.98, top=0.95, bottom=0.08, hspace=0.05)
     plt.savefig(output_file)
     plt.close()
+
+    cache[str(output_file)] = plot_hash
+    with open(cache_file, 'w', encoding="utf-8") as file:
+        file.write(json.dumps(cache))
     print(f'output in {output_file}')
@@ -1,37 +1,101 @@
-from dataclasses import dataclass
+import marshal
+import os
 from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple
 
 
-@dataclass
-class Word:
+class Word(NamedTuple):
+    # a tuple, a deck of 100k words takes a lot less memory than with an object per word
     question: str
     answer: str
 
-    def __init__(self, question, answer):
-        self.question = question
-        self.answer = answer
+
+def iter_exercise_file(path_to_word_file: Path) -> Iterator[Word]:
+    # The rows of the markdown tables in the file: '| question | answer // comment |'. The row above a separator row
+    # like '|---|---|' is a header. Rows with less than two cells or an empty cell are skipped, a row of empty cells
+    # like '|  |  |' too, the row above it is still a question.
+    pending = None
+    with open(path_to_word_file, 'r', encoding='utf-8') as file:
+        for line in file:
+            cells = line.split('|')
+            if len(cells) < 2:
+                continue
+            if not line.strip(' |\n'):
+                continue
+            if '-' in line and not line.strip(' |:-\n'):
+                pending = None
+                continue
+            if pending is not None:
+                yield pending
+                pending = None
+            # the cell before a leading '|' is empty
+            first = 0 if cells[0].strip() else 1
+            if len(cells) - first < 2:
+                continue
+            question = cells[first].strip()
+            answer = cells[first + 1]
+            if '//' in answer:
+                answer = answer[:answer.index('//')]
+            answer = answer.strip()
+            if question and answer:
+                pending = Word(question, answer)
+    if pending is not None:
+        yield pending
 
 
 def load_exercise_file(path_to_word_file: Path):
-    def get_word_from_line(line):
-        if line.find('question')>=0 or line.find("--")>=0:
-            return None
-        words = line.split('|')
-        if words[2].find('//')>0:
-            words[2] = words[2].split('//')[0]
-        return Word(words[1].strip(), words[2].strip())
+    return list(iter_exercise_file(path_to_word_file))
+
+
+def exercise_files(paths: Iterable[Path]) -> Iterator[Path]:
+    for path in paths:
+        if path.is_dir():
+            yield from sorted(path.rglob('*.md'))
+        else:
+            yield path
+
+
+def load_cache(cache_path: Path) -> dict:
+    # a cache written by another python version can't be read, it is written again
+    try:
+        with open(cache_path, 'rb') as file:
+            return marshal.loads(file.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return dict()
+
+
+def load_exercise_files(paths: Iterable[Path], cache_path: Path = None) -> list[Word]:
+    # The words of files and folders of files. The cache file has the words of every file with its modification
+    # time and size, a file that didn't change since is not parsed again. It is only read by this program, so it is
+    # stored with marshal, which loads a lot faster than json.
+    cache = load_cache(cache_path) if cache_path is not None else dict()
+    words = []
+    changed = False
+    for path in exercise_files(paths):
+        stat = os.stat(path)
+        key = str(path.absolute())
+        cached = cache.get(key)
+        if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            words.extend(map(Word._make, cached[2]))
+            continue
+        file_words = load_exercise_file(path)
+        words.extend(file_words)
+        cache[key] = (stat.st_mtime_ns, stat.st_size, [tuple(word) for word in file_words])
+        changed = True
+
+    if cache_path is not None and changed:
+        with open(cache_path, 'wb') as file:
+            marshal.dump(cache, file)
+    return words
 
-    with open(path_to_word_file) as file:
-        lines = file.readlines()
 
-    words = [get_word_from_line(line) for line in lines]
-    return list(filter(lambda word: word is not None, words))
+def do_exercise(file_name, cache_path: Path = None):
+    exercise_words(load_exercise_files([Path(file_name)], cache_path))
 
 
-def do_exercise(file_name):
+def exercise_words(words: list[Word]):
     correct = 0
     incorrect = 0
-    words = load_exercise_file(file_name)
     for word in words:
         answer = input(word.question + ': ').strip()
         if word.answer == answer:
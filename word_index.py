@@ -0,0 +1,134 @@
+import mmap
+import os
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Iterable
+
+from timings import timed
+
+# An index folder holds
+# - words.txt: the indexed words in sorted order, one per line, the line number is the id of the word
+# - offsets.bin: array('I') with per word id where its postings start, followed by where the last one ends
+# - episodes.bin: array('I') with the sorted episode numbers every word occurs in, word after word
+# - counts.bin: array('I') with how often the word occurs in each of those episodes
+# The arrays are stored in the byte order of the machine that wrote them.
+
+
+def add_postings(postings: dict[str, dict[int, int]], articles) -> dict[str, dict[int, int]]:
+    for article in articles:
+        for word, count in article.word_count.items():
+            postings.setdefault(word, dict())[article.sequence_number] = count
+    return postings
+
+
+def write_word_index(index_path: Path, postings: dict[str, dict[int, int]]):
+    write_sorted_word_index(index_path, ((word, sorted(postings[word].items())) for word in sorted(postings.keys())))
+
+
+@timed('index')
+def write_sorted_word_index(index_path: Path, postings: Iterable[tuple[str, list[tuple[int, int]]]]):
+    # the words come in sorted order, each with its (episode, count) pairs in order of the episodes
+    os.makedirs(index_path, exist_ok=True)
+    offsets = array('I', [0])
+    with open(index_path / 'words.txt', 'w', encoding='utf-8') as words_file, \
+            open(index_path / 'episodes.bin', 'wb') as episodes_file, open(index_path / 'counts.bin', 'wb') as counts_file:
+        for word, word_postings in postings:
+            words_file.write(word + '\n')
+            episodes_file.write(array('I', [episode for episode, _ in word_postings]).tobytes())
+            counts_file.write(array('I', [count for _, count in word_postings]).tobytes())
+            offsets.append(offsets[-1] + len(word_postings))
+    with open(index_path / 'offsets.bin', 'wb') as file:
+        file.write(offsets.tobytes())
+
+
+class WordIndex:
+    # Answers which episodes a word occurs in without loading the articles. Only the word list is read, the
+    # postings are memory mapped and read when a word is looked up.
+    def __init__(self, index_path: Path):
+        with open(index_path / 'words.txt', 'r', encoding='utf-8') as file:
+            self.words = file.read().splitlines()
+        self.maps = []
+        self.offsets = self.map_array(index_path / 'offsets.bin')
+        self.episode_numbers = self.map_array(index_path / 'episodes.bin')
+        self.counts = self.map_array(index_path / 'counts.bin')
+
+    def map_array(self, path: Path):
+        if os.path.getsize(path) == 0:
+            return memoryview(b'').cast('I')
+        with open(path, 'rb') as file:
+            self.maps.append(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+        return memoryview(self.maps[-1]).cast('I')
+
+    def close(self):
+        for values in [self.offsets, self.episode_numbers, self.counts]:
+            values.release()
+        for mapped in self.maps:
+            mapped.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def word_id(self, word):
+        position = bisect_left(self.words, word)
+        if position < len(self.words) and self.words[position] == word:
+            return position
+        return None
+
+    def __contains__(self, word):
+        return self.word_id(word) is not None
+
+    def episodes(self, word) -> dict[int, int]:
+        # the episodes the word occurs in, in order, with how often it occurs in each of them
+        word_id = self.word_id(word)
+        if word_id is None:
+            return dict()
+        start, end = self.offsets[word_id], self.offsets[word_id + 1]
+        return dict(zip(self.episode_numbers[start:end], self.counts[start:end]))
+
+    def first_occurrence(self, word):
+        word_id = self.word_id(word)
+        if word_id is None:
+            return None
+        return self.episode_numbers[self.offsets[word_id]]
+
+    def words_with_prefix(self, prefix) -> list[str]:
+        # every word that starts with the prefix sorts before the prefix followed by the highest code point
+        return self.words[bisect_left(self.words, prefix):bisect_left(self.words, prefix + chr(0x10ffff))]
+
+    def episodes_with_all(self, words: Iterable[str]) -> list[int]:
+        # intersect the rarest word first, the result can only get smaller
+        postings = sorted((self.episodes(word) for word in words), key=len)
+        if not postings:
+            return []
+        result = set(postings[0].keys())
+        for word_postings in postings[1:]:
+            result.intersection_update(word_postings.keys())
+        return sorted(result)
+
+    def postings(self) -> dict[str, dict[int, int]]:
+        return {word: self.episodes(word) for word in self.words}
+
+
+def query(data_path: Path, words: list[str], prefix=False):
+    with WordIndex(data_path / 'index') as index:
+        if prefix:
+            for word_prefix in words:
+                matches = index.words_with_prefix(word_prefix)
+                if not matches:
+                    print(f'no word starts with {word_prefix}')
+                for word in matches:
+                    print(f'{word}: {len(index.episodes(word))} episodes')
+        elif len(words) == 1:
+            episodes = index.episodes(words[0])
+            if not episodes:
+                print(f'{words[0]} does not occur in any episode')
+                return
+            print(f'{words[0]}: {len(episodes)} episodes, first in episode {index.first_occurrence(words[0])}')
+            print(', '.join(f'{episode} ({count}x)' for episode, count in episodes.items()))
+        else:
+            episodes = index.episodes_with_all(words)
+            print(f'{len(episodes)} episodes contain {", ".join(words)}: {", ".join(map(str, episodes))}')